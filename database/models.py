@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Float, Boolean, Date, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, Boolean, Date, DateTime, ForeignKey, Index
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
@@ -7,12 +7,26 @@ class Club(Base):
     __tablename__ = 'clubs'
     club_id = Column(String, primary_key=True)
     name = Column(String)
+    priority = Column(Integer)           # Forgangur, lower books shared halls first in batch runs
 
 class Area(Base):
     __tablename__ = 'areas'
     area_id = Column(String, primary_key=True)
     name = Column(String)
 
+class AreaPart(Base):
+    """
+    Composition of a subdivided area, e.g. A-sal is made of 1/3 A-sal-1, -2 and -3.
+    An area occupies all of its parts (recursively), so two areas clash if their parts intersect.
+    """
+    __tablename__ = 'area_parts'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    area_id = Column(String, ForeignKey('areas.area_id'))
+    part_area_id = Column(String, ForeignKey('areas.area_id'))
+    __table_args__ = (
+        Index('uq_area_parts_natural', 'area_id', 'part_area_id', unique=True),
+    )
+
 class Activity(Base):
     """
     Represents one row from your data file (e.g., "4 fl kk fótbolti").
@@ -46,6 +60,10 @@ class Session(Base):
     max_end = Column(Integer)            # Minutes from midnight
     activity = relationship("Activity", back_populates="sessions")
     area = relationship("Area")
+    __table_args__ = (
+        Index('uq_sessions_natural', 'activity_id', 'day_of_week', 'area_id', unique=True),
+        Index('ix_sessions_area', 'area_id'),
+    )
 
 class Conflict(Base):
     """
@@ -55,6 +73,10 @@ class Conflict(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     activity_id = Column(String, ForeignKey('activities.activity_id'))
     conflict_activity_id = Column(String)  # not FK, for flexibility
+    __table_args__ = (
+        Index('uq_conflicts_natural', 'activity_id', 'conflict_activity_id', unique=True),
+        Index('ix_conflicts_conflict_activity', 'conflict_activity_id'),
+    )
 
 class Prerequisite(Base):
     """
@@ -64,4 +86,37 @@ class Prerequisite(Base):
     id = Column(Integer, primary_key=True, autoincrement=True)
     activity_id = Column(String, ForeignKey('activities.activity_id'))
     must_be_before_activity_id = Column(String)  # not FK, for flexibility
+    __table_args__ = (
+        Index('uq_prerequisites_natural', 'activity_id', 'must_be_before_activity_id', unique=True),
+        Index('ix_prerequisites_before_activity', 'must_be_before_activity_id'),
+    )
 
+class ScheduleRun(Base):
+    """
+    One solve (or heuristic run) whose schedule is stored in assignments.
+    """
+    __tablename__ = 'schedule_runs'
+    run_id = Column(Integer, primary_key=True, autoincrement=True)
+    created = Column(DateTime)
+    method = Column(String)              # 'gurobi', 'ortools', 'decompose', 'lns', ...
+    status = Column(String)              # 'optimal' or 'feasible'
+    objective = Column(Float)
+    assignments = relationship("Assignment", back_populates="run")
+
+class Assignment(Base):
+    """
+    Where and when one exercise (subsession) of an activity takes place in a run.
+    """
+    __tablename__ = 'assignments'
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    run_id = Column(Integer, ForeignKey('schedule_runs.run_id'))
+    exercise_id = Column(String)         # "4 fl kk fótbolti - 1"
+    activity_id = Column(String, ForeignKey('activities.activity_id'))
+    day_of_week = Column(String)
+    area_id = Column(String, ForeignKey('areas.area_id'))
+    start = Column(Float)                # Minutes from midnight
+    end = Column(Float)                  # Minutes from midnight
+    run = relationship("ScheduleRun", back_populates="assignments")
+    __table_args__ = (
+        Index('ix_assignments_run', 'run_id', 'day_of_week', 'area_id'),
+    )
@@ -1,9 +1,24 @@
 # app.py
 
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
 import streamlit as st
 import pandas as pd
 from streamlit_calendar import calendar
 import datetime
+import json
+import uuid
+from contextlib import closing
+from model import jobs
+from model.data import DB_URL, get_session
+from model.results import ASSIGNMENT_COLUMNS, latest_run_id, load_run
+
+# Solves that can run at the same time, for all users of this server
+JOB_WORKERS = 2
+
+DAY_OFFSET = {"mán": 0, "þri": 1, "mið": 2, "fim": 3, "fös": 4, "lau": 5, "sun": 6}
 
 st.set_page_config(page_title="Sports Timetable", layout="wide")
 
@@ -17,34 +32,43 @@ def get_data(url):
     df.columns = [col.strip() for col in df.columns]
     return df
 
+@st.cache_data
+def sheet_areas(url):
+    # One row per (sheet row, area), indexed by the sheet row, so area filters are a single isin
+    return get_data(url)['Salur/svæði'].astype(str).str.split('|').explode().str.strip()
+
 df = get_data(SHEET_URL)
 
 if df.empty or not set(['Æfing', 'Salur/svæði']).issubset(df.columns):
     st.error("The Google Sheet does not contain the expected columns ('Æfing', 'Salur/svæði', ...). Please check your data.")
     st.stop()
 
-# ---- 2. Clean and prep data for UI ----
-# For demo, create 'Dagur', 'Byrjun', 'Endir' columns if missing
-if 'Dagur' not in df.columns:
-    import numpy as np
-    days = ['mán', 'þri', 'mið', 'fim', 'fös', 'lau', 'sun']
-    df['Dagur'] = np.random.choice(days, size=len(df))
-    df['Byrjun'] = np.random.choice(['08:00', '10:00', '12:00', '16:00', '18:00'], size=len(df))
-    df['Endir'] = np.random.choice(['09:30', '11:30', '13:30', '17:30', '19:30'], size=len(df))
+# ---- 2. Latest schedule run from the database ----
+@st.cache_data(ttl=5)
+def current_run_id(db_url):
+    with closing(get_session(db_url)) as db:
+        return latest_run_id(db)
+
+@st.cache_data
+def run_assignments(db_url, run_id):
+    with closing(get_session(db_url)) as db:
+        return load_run(db, run_id)
+
+run_id = current_run_id(DB_URL)
+assignments = run_assignments(DB_URL, run_id) if run_id is not None else pd.DataFrame(columns=ASSIGNMENT_COLUMNS)
 
 # ---- 3. Sidebar filters ----
 st.sidebar.header("Filters")
-room_options = sorted({s for sv in df['Salur/svæði'] for s in str(sv).split('|')})
+areas = sheet_areas(SHEET_URL)
+room_options = sorted(set(areas) | set(assignments['area_id']))
 room_filter = st.sidebar.multiselect("Select area(s)", room_options, default=room_options)
 
-exercise_options = sorted(df['Æfing'].unique())
+exercise_options = sorted(set(df['Æfing'].dropna()) | set(assignments['activity_id']))
 exercise_filter = st.sidebar.multiselect("Select exercise(s)", exercise_options, default=exercise_options)
 
 # ---- 4. Apply filters ----
-df_filtered = df[
-    df['Æfing'].isin(exercise_filter) &
-    df['Salur/svæði'].apply(lambda sv: any(r in str(sv).split('|') for r in room_filter))
-].copy()
+in_rooms = areas.isin(room_filter).groupby(level=0).any().reindex(df.index, fill_value=False)
+df_filtered = df[df['Æfing'].isin(exercise_filter) & in_rooms].copy()
 
 # ---- 5. Editable Table ----
 st.subheader("📋 Timetable Table (Editable)")
@@ -55,39 +79,91 @@ edited_df = st.data_editor(
     key="editable_table"
 )
 
-# ---- 6. Optimization button ----
+# ---- 6. Optimization jobs ----
+# Solves run in worker processes on a SQLite job queue, so the page never waits for the solver
+@st.cache_resource
+def job_workers():
+    return jobs.start_workers(JOB_WORKERS)
+
+job_workers()
+if 'owner' not in st.session_state:
+    st.session_state['owner'] = uuid.uuid4().hex
+
+backend = st.sidebar.selectbox("Solver", ['gurobi', 'ortools'])
+time_limit = st.sidebar.number_input("Time limit (seconds)", min_value=1, value=60)
+if st.sidebar.button("Quick Preview"):
+    # The greedy heuristic takes well under a second, so it runs in the page
+    try:
+        rows, unplaced = jobs.preview(edited_df)
+        st.session_state['calendar_result'] = rows
+        if unplaced:
+            st.sidebar.warning(f"Preview could not place {len(unplaced)} exercise(s): {', '.join(unplaced[:5])}")
+    except Exception as exc:
+        st.sidebar.error(f"Preview failed: {exc}")
 if st.sidebar.button("Run Optimization"):
-    st.info("Running optimization on the edited table...")
-    # Here is where you should call your optimization logic with 'edited_df'
-    # Example: result_df = run_gurobi_optimization(edited_df)
-    st.success("Optimization complete! (Demo only)")
-
-# ---- 7. Convert table to calendar events ----
-def timetable_to_events(df):
-    day_map = {"mán": 0, "þri": 1, "mið": 2, "fim": 3, "fös": 4, "lau": 5, "sun": 6}
-    base_date = datetime.date.today() - datetime.timedelta(days=datetime.date.today().weekday())  # Monday
+    job_id = jobs.submit(edited_df, backend, time_limit, owner=st.session_state['owner'])
+    st.sidebar.info(f"Optimization job {job_id} queued.")
+
+@st.fragment(run_every=2)
+def job_progress():
+    rows = jobs.list_jobs(owner=st.session_state['owner'], limit=10)
+    if not rows:
+        return
+    st.subheader("⚙️ Optimization Jobs")
+    table = pd.DataFrame(rows)[['job_id', 'status', 'backend', 'objective', 'gap', 'elapsed', 'error']]
+    st.dataframe(table, use_container_width=True, hide_index=True)
+    # Rerun the whole page once a new result is in, so the calendar shows it
+    latest = next((r['job_id'] for r in rows if r['status'] == 'done'), None)
+    if latest is not None and latest != st.session_state.get('result_job'):
+        st.session_state['result_job'] = latest
+        st.session_state['calendar_result'] = json.loads(jobs.get_job(latest)['result'])
+        st.rerun()
+
+job_progress()
+
+# ---- 7. Convert schedules to calendar events ----
+def to_events(title, day, start, end):
+    """
+    Calendar events from aligned Series: title, day ('mán', ...) and start/end in minutes from midnight.
+    """
+    monday = pd.Timestamp(datetime.date.today() - datetime.timedelta(days=datetime.date.today().weekday()))
+    date = monday + pd.to_timedelta(day.map(DAY_OFFSET), unit='D')
+    start = date + pd.to_timedelta(start, unit='m')
+    end = date + pd.to_timedelta(end, unit='m')
+    valid = start.notna() & end.notna()
+    return pd.DataFrame({
+        "title": title[valid],
+        "start": start[valid].dt.strftime('%Y-%m-%dT%H:%M:%S'),
+        "end": end[valid].dt.strftime('%Y-%m-%dT%H:%M:%S'),
+        "backgroundColor": "#1976D2",
+    }).to_dict('records')
+
+def assignment_events(frame, rooms, activities):
+    frame = frame[frame['area_id'].isin(rooms) & frame['activity_id'].isin(activities)]
+    return to_events(frame['exercise_id'] + ' (' + frame['area_id'] + ')', frame['day_of_week'], frame['start'], frame['end'])
 
+@st.cache_data
+def run_events(db_url, run_id, rooms, activities):
+    # Keyed by run id and filter set, so reruns of the page do not rebuild the events
+    return assignment_events(run_assignments(db_url, run_id), set(rooms), set(activities))
+
+def minutes(col):
+    parts = col.astype(str).str.extract(r'^\s*(\d{1,2}):(\d{2})').astype(float)
+    return parts[0]*60 + parts[1]
+
+rooms, activities = tuple(sorted(room_filter)), tuple(sorted(exercise_filter))
+if 'calendar_result' in st.session_state and st.sidebar.checkbox("Show computed schedule", value=True):
+    result = pd.DataFrame(st.session_state['calendar_result'], columns=ASSIGNMENT_COLUMNS)
+    events = assignment_events(result, set(rooms), set(activities))
+elif run_id is not None:
+    events = run_events(DB_URL, run_id, rooms, activities)
+    st.caption(f"Showing schedule run {run_id}.")
+elif {'Dagur', 'Byrjun', 'Endir'}.issubset(edited_df.columns):
+    title = edited_df['Æfing'].astype(str) + ' (' + edited_df['Salur/svæði'].astype(str).str.split('|').str[0] + ')'
+    events = to_events(title, edited_df['Dagur'], minutes(edited_df['Byrjun']), minutes(edited_df['Endir']))
+else:
     events = []
-    for _, row in df.iterrows():
-        day_idx = day_map.get(row['Dagur'], 0)
-        try:
-            start_hour, start_min = map(int, str(row['Byrjun']).split(':'))
-            end_hour, end_min = map(int, str(row['Endir']).split(':'))
-        except Exception:
-            continue
-        date = base_date + datetime.timedelta(days=day_idx)
-        start_dt = datetime.datetime.combine(date, datetime.time(start_hour, start_min))
-        end_dt = datetime.datetime.combine(date, datetime.time(end_hour, end_min))
-        area = str(row['Salur/svæði']).split('|')[0]
-        events.append({
-            "title": f"{row['Æfing']} ({area})",
-            "start": start_dt.isoformat(),
-            "end": end_dt.isoformat(),
-            "backgroundColor": "#1976D2"
-        })
-    return events
-
-events = timetable_to_events(edited_df)
+    st.info("No schedule yet. Run a preview or an optimization to fill the calendar.")
 
 # ---- 8. Calendar UI ----
 st.subheader("📅 Weekly Timetable")
@@ -0,0 +1,275 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import time
+from contextlib import closing
+from multiprocessing import get_context
+from sqlalchemy import text
+from model.data import DB_URL, get_session, load_data, build_index
+from model.snapshot import load_cached
+from model.greedy import greedy_schedule
+from model.lns import sub_problem
+from model.decompose import components
+from model.jobs import JOBS_DB, connect, result_rows
+from model.results import save_run
+from utils.import_activities import ensure_club_priority
+
+FINISHED = ('done', 'partial', 'failed')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS batch_jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    batch_id INTEGER NOT NULL,
+    name TEXT NOT NULL,             -- club id, or the first activity of a facility group
+    activities TEXT NOT NULL,       -- JSON list of activity ids
+    depends TEXT NOT NULL,          -- JSON list of job ids whose reservations this job must respect
+    status TEXT NOT NULL,           -- queued, running, done, partial, failed
+    db_url TEXT NOT NULL,
+    no_cache INTEGER NOT NULL,
+    backend TEXT NOT NULL,
+    time_limit REAL,
+    threads INTEGER,
+    exercises INTEGER,
+    placed INTEGER,
+    result TEXT,                    -- JSON list of [ex, activity, day, area, start, end]
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS ix_batch_jobs_batch ON batch_jobs (batch_id, status, job_id);
+"""
+
+
+def init(path=JOBS_DB):
+    with closing(connect(path)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+
+def club_order(db):
+    """
+    Club ids by priority (lower first, clubs without one last), then id.
+    """
+    ensure_club_priority(db.connection())
+    db.commit()
+    rows = db.execute(text("SELECT club_id, priority FROM clubs")).fetchall()
+    return [c for c, p in sorted(rows, key=lambda r: (r[1] is None, r[1] or 0, str(r[0])))]
+
+
+def club_groups(data, order):
+    """
+    Activities of each club, in the given club order (clubs not in it, and activities without a club, last).
+    """
+    groups = {}
+    for e in data['E']:
+        groups.setdefault(data['club'].get(e), []).append(e)
+    rank = {c: i for i, c in enumerate(order)}
+    return sorted(groups.items(), key=lambda g: (rank.get(g[0], len(rank)), str(g[0])))
+
+
+def dependencies(data, index, groups):
+    """
+    For each group, the earlier groups it interacts with: a physical unit both can use on the same day,
+    or a Conflict or Prerequisite row between them. A group is solved after those and around their schedules.
+    """
+    units = index['area_units']
+    group_of = {e: i for i, (name, activities) in enumerate(groups) for e in activities}
+    exercise_group = {ex: group_of[e] for e, exs in data['EXsubset'].items() for ex in exs}
+    cells = [set() for _ in groups]
+    for (ex, d, a) in data['EDA']:
+        cells[exercise_group[ex]].update((d, u) for u in units.get(a, [a]))
+    links = [set() for _ in groups]
+    pairs = [(e1, e2) for e1, e2s in data['CX'].items() for e2 in e2s] + list(data['undan_eftir'].items())
+    for e1, e2 in pairs:
+        if e1 in group_of and e2 in group_of and group_of[e1] != group_of[e2]:
+            links[group_of[e1]].add(group_of[e2])
+            links[group_of[e2]].add(group_of[e1])
+    return [[i for i in range(j) if i in links[j] or cells[i] & cells[j]] for j in range(len(groups))]
+
+
+def submit_batch(data, groups, depends, db_url=DB_URL, no_cache=False, backend='gurobi', time_limit=600, threads=1,
+                 path=JOBS_DB):
+    """
+    Queue one job per group, in order. depends lists the positions of the groups each one waits for.
+    Returns the batch id.
+    """
+    init(path)
+    with closing(connect(path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        batch_id = (conn.execute("SELECT MAX(batch_id) FROM batch_jobs").fetchone()[0] or 0) + 1
+        job_ids = []
+        for (name, activities), deps in zip(groups, depends):
+            cur = conn.execute(
+                "INSERT INTO batch_jobs (batch_id, name, activities, depends, status, db_url, no_cache, backend, "
+                "time_limit, threads, exercises, created) VALUES (?, ?, ?, ?, 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                (batch_id, str(name), json.dumps(activities, ensure_ascii=False), json.dumps([job_ids[i] for i in deps]),
+                 db_url, int(no_cache), backend, time_limit, threads,
+                 sum(len(data['EXsubset'][e]) for e in activities), time.time())
+            )
+            job_ids.append(cur.lastrowid)
+        conn.execute("COMMIT")
+    return batch_id
+
+
+def batch_jobs(batch_id, path=JOBS_DB):
+    with closing(connect(path)) as conn:
+        rows = conn.execute("SELECT * FROM batch_jobs WHERE batch_id = ? ORDER BY job_id", (batch_id,))
+        return [dict(r) for r in rows]
+
+
+def claim_ready(batch_id, path=JOBS_DB):
+    """
+    Take the first queued job of a batch whose dependencies have finished and mark it running.
+    Returns (job id or None, number of jobs still queued).
+    """
+    with closing(connect(path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        rows = conn.execute("SELECT job_id, status, depends FROM batch_jobs WHERE batch_id = ? ORDER BY job_id",
+                            (batch_id,)).fetchall()
+        finished = {r['job_id'] for r in rows if r['status'] in FINISHED}
+        queued = [r for r in rows if r['status'] == 'queued']
+        ready = next((r['job_id'] for r in queued if set(json.loads(r['depends'])) <= finished), None)
+        if ready is not None:
+            conn.execute("UPDATE batch_jobs SET status = 'running', started = ? WHERE job_id = ?", (time.time(), ready))
+        conn.execute("COMMIT")
+    return ready, len(queued)
+
+
+def finish_job(job_id, status, rows=None, error=None, path=JOBS_DB):
+    with closing(connect(path)) as conn:
+        conn.execute(
+            "UPDATE batch_jobs SET status = ?, placed = ?, result = ?, error = ?, finished = ? WHERE job_id = ?",
+            (status, len(rows) if rows is not None else None,
+             json.dumps(rows, ensure_ascii=False) if rows is not None else None, error, time.time(), job_id)
+        )
+
+
+def reservations(jobs):
+    """
+    The schedule {ex: (d, a, start)} of finished jobs.
+    """
+    schedule = {}
+    for job in jobs:
+        for ex, e, d, a, start, end in json.loads(job['result'] or '[]'):
+            schedule[ex] = (d, a, start)
+    return schedule
+
+
+def solve_group(data, index, activities, reserved, backend='gurobi', time_limit=600, threads=1):
+    """
+    Schedule the exercises of a group around the reserved (fixed) exercises of earlier groups, starting
+    from the greedy schedule. Falls back to the greedy schedule when the solver finds no schedule
+    with every exercise placed. Returns the schedule of the group's exercises.
+    """
+    if backend == 'gurobi':
+        from model.run_gurobi import build_model, solve
+        from model.warmstart import schedule_start as set_start
+    else:
+        from model.run_ortools import build_model, solve
+        from model.warmstart import schedule_hint as set_start
+    free = {ex for e in activities for ex in data['EXsubset'][e]}
+    sub = sub_problem(data, index, reserved, free)
+    sub_index = build_index(sub)
+    greedy = greedy_schedule(sub, sub_index)
+    schedule = None
+    if sub['EX']:
+        model, vars = build_model(sub, sub_index)
+        set_start(model, vars, greedy, sub, sub_index)
+        schedule = solve(model, vars, time_limit, threads, log=False)
+    return {ex: v for ex, v in (schedule or greedy).items() if ex in free}
+
+
+def work_batch(batch_id, path=JOBS_DB, poll=1.0):
+    """
+    Worker loop for one batch: run ready jobs until none are queued. The model inputs are loaded once per worker.
+    """
+    data = index = None
+    while True:
+        job_id, queued = claim_ready(batch_id, path)
+        if job_id is None:
+            if queued == 0:
+                return
+            time.sleep(poll)
+            continue
+        jobs = {job['job_id']: job for job in batch_jobs(batch_id, path)}
+        job = jobs[job_id]
+        try:
+            if data is None:
+                db = get_session(job['db_url'])
+                data = load_data(db) if job['no_cache'] else load_cached(db)
+                db.close()
+                index = build_index(data)
+            activities = json.loads(job['activities'])
+            reserved = reservations(jobs[i] for i in json.loads(job['depends']))
+            schedule = solve_group(data, index, activities, reserved, job['backend'], job['time_limit'],
+                                   job['threads'] or 1)
+        except Exception as exc:
+            finish_job(job_id, 'failed', error=f'{type(exc).__name__}: {exc}', path=path)
+            continue
+        status = 'done' if len(schedule) == job['exercises'] else 'partial'
+        finish_job(job_id, status, result_rows(data, schedule), path=path)
+
+
+def run_batch(batch_id, workers=None, path=JOBS_DB):
+    """
+    Run a batch on worker processes (one per core by default) and wait for it. Jobs left running by an
+    interrupted run are queued again.
+    """
+    with closing(connect(path)) as conn:
+        conn.execute("UPDATE batch_jobs SET status = 'queued' WHERE batch_id = ? AND status = 'running'", (batch_id,))
+    processes = []
+    for _ in range(workers or os.cpu_count()):
+        p = get_context('spawn').Process(target=work_batch, args=(batch_id, path))
+        p.start()
+        processes.append(p)
+    for p in processes:
+        p.join()
+    return batch_jobs(batch_id, path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Schedule many clubs sharing halls as a batch of queued jobs.")
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-read the database instead of using the compiled snapshot")
+    parser.add_argument('--by', choices=['club', 'facility'], default='club',
+                        help="one job per club (solved in priority order around earlier clubs' bookings) "
+                             "or per independent group of facilities")
+    parser.add_argument('--backend', choices=['gurobi', 'ortools'], default='gurobi')
+    parser.add_argument('--time-limit', type=float, default=600, help="solver time limit in seconds per job")
+    parser.add_argument('--threads', type=int, default=1, help="solver threads per job")
+    parser.add_argument('--workers', type=int, default=None, help="jobs solved at the same time (default: all cores)")
+    parser.add_argument('--jobs-db', default=JOBS_DB, help="SQLite file with the job queue")
+    parser.add_argument('--resume', type=int, default=None, help="continue an interrupted batch instead of submitting one")
+    args = parser.parse_args()
+
+    db = get_session(args.db)
+    data = load_data(db) if args.no_cache else load_cached(db)
+    if args.resume is None:
+        if args.by == 'club':
+            groups = club_groups(data, club_order(db))
+            depends = dependencies(data, build_index(data), groups)
+        else:
+            groups = [(part[0], part) for part in components(data)]
+            depends = [[] for _ in groups]
+        batch_id = submit_batch(data, groups, depends, args.db, args.no_cache, args.backend, args.time_limit,
+                                args.threads, args.jobs_db)
+        print(f"batch {batch_id}: {len(groups)} jobs queued")
+    else:
+        batch_id = args.resume
+    jobs = run_batch(batch_id, args.workers, args.jobs_db)
+    for job in jobs:
+        elapsed = job['finished'] - job['started'] if job['finished'] and job['started'] else 0.0
+        print(f"{job['name'][:30]:<30} {job['status']:<8} {job['placed'] or 0:>5} of {job['exercises']:>5} exercises "
+              f"{elapsed:>8.1f}s{'  ' + job['error'] if job['error'] else ''}")
+    schedule = reservations(j for j in jobs if j['status'] in ('done', 'partial'))
+    print(f"placed {len(schedule)} of {len(data['EX'])} exercises")
+    print(f"Saved as schedule run {save_run(db, data, schedule, 'batch')}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,74 @@
+def disjunction_list(index):
+    """
+    Every no-overlap disjunction of the model as (e1, e2, block, EDA indices of e1, EDA indices of e2).
+    The start of e1 is the sum of x over its indices (only one of them can be active), likewise for e2.
+    """
+    EDA_ed, EDA_edu = index['EDA_ed'], index['EDA_edu']
+    disjunctions = [
+        (e1, e2, 'unit', [(e1, d, a) for a in EDA_edu[e1, d, u]], [(e2, d, a) for a in EDA_edu[e2, d, u]])
+        for (e1, e2, d, u) in index['unit_pairs']
+    ]
+    disjunctions += [
+        (ex1, ex2, 'conflict', [(ex1, d, a) for a in EDA_ed[ex1, d]], [(ex2, d, a) for a in EDA_ed[ex2, d]])
+        for (ex1, ex2, d) in index['conflict_pairs']
+    ]
+    return disjunctions
+
+
+def window(data, inds):
+    """
+    Start window (lb, ub) of an exercise over the EDA indices inds.
+    """
+    return min(data['LB'][i] for i in inds), max(data['UB'][i] for i in inds)
+
+
+def disjunction_bigm(w1, dx1, w2, dx2):
+    """
+    Big-M values for the disjunction between two exercises with start windows w1 = (lb1, ub1), w2 = (lb2, ub2)
+
+        x1 + dx1 <= x2 + m12[0]*(1-z1) + m12[1]*(1-z2) + m12[2]*y
+        x2 + dx2 <= x1 + m21[0]*(1-z1) + m21[1]*(1-z2) + m21[2]*(1-y)
+
+    where x is 0 when z is 0. Returns (m12, m21, order), order is
+        'drop' if the windows can not overlap, so the disjunction always holds
+        0 if only e1 before e2 is possible (y = 0)
+        1 if only e2 before e1 is possible (y = 1)
+        'free' otherwise
+    """
+    (lb1, ub1), (lb2, ub2) = w1, w2
+    if ub1 + dx1 <= lb2 or ub2 + dx2 <= lb1:
+        return None, None, 'drop'
+    m12 = (max(0.0, dx1 - lb2), ub1 + dx1, ub1 + dx1 - lb2)
+    m21 = (ub2 + dx2, max(0.0, dx2 - lb1), ub2 + dx2 - lb1)
+    first = lb1 + dx1 <= ub2
+    second = lb2 + dx2 <= ub1
+    if first and not second:
+        return m12, m21, 0
+    if second and not first:
+        return m12, m21, 1
+    return m12, m21, 'free'
+
+
+def fixed_orders(disjunctions, bigms):
+    """
+    Value of y for each pair whose kept disjunctions all force the same order, and the pairs that keep any disjunction.
+    """
+    orders = {}
+    for (e1, e2, block, ix1, ix2), (m12, m21, order) in zip(disjunctions, bigms):
+        if order != 'drop':
+            orders.setdefault((e1, e2), set()).add(order)
+    fixed = {p: o.pop() for p, o in orders.items() if len(o) == 1 and o <= {0, 1}}
+    return fixed, set(orders)
+
+
+def precedence_bigm(data, index, e1, e2, d):
+    """
+    Big-M values for the precedence constraints of (e1, e2) on day d, with S1 the end of e1 and S2 the start of e2
+
+        S1 <= S2 + 0*(1-Z1) + le*(1-Z2)
+        S1 >= S2 - ge*(1-Z1) - 0*(1-Z2)
+    """
+    EDA_ed, UB, DX = index['EDA_ed'], data['UB'], data['DX']
+    le = max([UB[ex, d, a] + DX[ex] for ex in data['EXsubset'][e1] for a in EDA_ed.get((ex, d), [])], default=0.0)
+    ge = max([UB[ex, d, a] for ex in data['EXsubset'][e2] for a in EDA_ed.get((ex, d), [])], default=0.0)
+    return le, ge
@@ -0,0 +1,383 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import warnings
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.models import Activity, Area, AreaPart, Session as DbSession, Conflict, Prerequisite
+from utils.import_activities import AREA_PARTS
+
+DB_URL = 'sqlite:///sports_schedule.db'
+
+D = ['sun', 'mán', 'þri', 'mið', 'fim', 'fös', 'lau']
+Dw = ['sun', 'lau']
+
+
+
+def get_session(db_url=DB_URL):
+    engine = create_engine(db_url)
+    SessionLocal = sessionmaker(bind=engine)
+    return SessionLocal()
+
+
+def ensure_area_parts(db):
+    """
+    Create the area_parts table on databases from before it existed. While it is empty, the composition of
+    the importer's subdivided halls (AREA_PARTS) that are in the database is written to it, adding missing
+    part areas. Warns about areas named as hall parts ('1/3 ...', '2/3 ...') that are in no composition,
+    as those are not known to share space with anything.
+    """
+    AreaPart.__table__.create(db.get_bind(), checkfirst=True)
+    areas = {a.area_id for a in db.query(Area).all()}
+    if db.query(AreaPart).first() is None:
+        halls = {a: parts for a, parts in AREA_PARTS.items() if a in areas}
+        for part in sorted({p for parts in halls.values() for p in parts} - areas):
+            db.add(Area(area_id=part, name=part))
+            areas.add(part)
+        db.add_all(AreaPart(area_id=a, part_area_id=p) for a, parts in halls.items() for p in parts)
+        db.commit()
+    composed = {a for p in db.query(AreaPart).all() for a in (p.area_id, p.part_area_id)}
+    loose = sorted(a for a in areas if a.startswith(('1/3 ', '2/3 ')) and a not in composed)
+    if loose:
+        warnings.warn(f"Areas without a hall composition in area_parts, scheduled as separate halls: {', '.join(loose)}")
+
+
+def exercise_name(e, i, weekend=False):
+    """
+    Name of the i-th (from 0) weekday or weekend exercise of activity e, e.g. "4 fl kk fótbolti - 1".
+    """
+    return e + (" * " if weekend else " - ") + str(i+1)
+
+
+def load_data(db):
+    """
+    Read the model inputs (E, EX, DX, EDA, UB, LB, CX, undan_eftir, ...) from the database.
+    """
+    ensure_area_parts(db)
+    activities = db.query(Activity).all()
+    E = [a.activity_id for a in activities]
+    A = [a.area_id for a in db.query(Area).all()]
+    db_sessions = db.query(DbSession).all()
+
+    # e_a: which areas are allowed for each activity
+    e_a = {}
+    for s in db_sessions:
+        e_a.setdefault(s.activity_id, set()).add(s.area_id)
+
+    # class_schedule: for each activity, which days have what time ranges
+    class_schedule = {}
+    for s in db_sessions:
+        class_schedule.setdefault(s.activity_id, {})[s.day_of_week] = (s.min_start, s.max_end)
+
+    # number_exercises: lengths and group counts
+    number_exercises = {}
+    for a in activities:
+        l_str = a.length_str or ''
+        l_wknd_str = a.length_weekend_str or ''
+        lengd = [float(x.strip()) for x in l_str.split(',') if x.strip()] if l_str else []
+        lengd_helgar = [float(x.strip()) for x in l_wknd_str.split(',') if x.strip()] if l_wknd_str else []
+        number_exercises[a.activity_id] = [lengd, lengd_helgar, a.groups_count or 1]
+
+    # EXsubset and DXsubset
+    EXsubset = {}
+    DXsubset = {}
+    for e in E:
+        EXsubset[e] = [exercise_name(e, i) for i in range(len(number_exercises[e][0]))] + \
+                      [exercise_name(e, i, weekend=True) for i in range(len(number_exercises[e][1]))]
+        DXsubset[e] = [dx*number_exercises[e][2] for dx in number_exercises[e][0]] + \
+                      [dx*number_exercises[e][2] for dx in number_exercises[e][1]]
+    EX = [item for sublist in EXsubset.values() for item in sublist]
+    DX_values = [value for sublist in DXsubset.values() for value in sublist]
+    DX = dict(zip(EX, DX_values))
+
+    # --- Build EDA, UB, LB, CX ---
+    EDA = []
+    UB = {}
+    LB = {}
+    CX = {}
+    for e in E:
+        for d in D:
+            for a_ in e_a.get(e, []):
+                if d in class_schedule[e].keys():
+                    for ex in EXsubset[e]:
+                        if d in Dw and '*' in ex:
+                            EDA.append((ex, d, a_))
+                        if d not in Dw and '*' not in ex:
+                            EDA.append((ex, d, a_))
+                        ub_val = class_schedule[e][d][1]
+                        lb_val = class_schedule[e][d][0]
+                        if ub_val is None:
+                            ub_val = 24*60  # or another max value
+                        if lb_val is None:
+                            lb_val = 0
+                        UB[(ex, d, a_)] = float(ub_val)
+                        LB[(ex, d, a_)] = float(lb_val)
+
+    # Conflicts (build CX mapping each activity to its conflicting activities)
+    conflict_dict = {}
+    for c in db.query(Conflict).all():
+        conflict_dict.setdefault(c.activity_id, []).append(c.conflict_activity_id)
+    for e in E:
+        if e in conflict_dict.keys():
+            tmp = [e_ for e_ in conflict_dict[e] if e_ in EXsubset.keys()]
+            if len(tmp) > 0:
+                CX[e] = tmp
+
+    # Precedence (fyrir/undan)
+    undan_eftir = {}
+    for p in db.query(Prerequisite).all():
+        if p.activity_id in EXsubset and p.must_be_before_activity_id in EXsubset:
+            undan_eftir[p.activity_id] = p.must_be_before_activity_id
+
+    # area_parts: the parts each subdivided area is made of (hall composition)
+    area_parts = {}
+    for p in db.query(AreaPart).order_by(AreaPart.area_id, AreaPart.part_area_id).all():
+        area_parts.setdefault(p.area_id, []).append(p.part_area_id)
+
+    # Club of each activity, for club-level neighbourhoods
+    club = {a.activity_id: a.club_id for a in activities}
+    # Period of each activity (dates, None if open), for season planning
+    period = {a.activity_id: (a.period_start, a.period_end) for a in activities}
+
+    # Objective weight for each area
+    bias = {a: 1.0 for a in A}
+    bias['1/3 A-sal-1'] = 1.02
+    bias['1/3 A-sal-2'] = 1.01
+
+    return {
+        'E': E, 'D': list(D), 'Dw': list(Dw), 'A': A,
+        'e_a': e_a, 'class_schedule': class_schedule,
+        'EXsubset': EXsubset, 'EX': EX, 'DX': DX,
+        'EDA': EDA, 'UB': UB, 'LB': LB, 'CX': CX,
+        'undan_eftir': undan_eftir,
+        'area_parts': area_parts,
+        'bias': bias,
+        'club': club,
+        'period': period,
+    }
+
+
+def area_units(area_parts, A):
+    """
+    Physical units each area occupies. An area that is split up (a key of area_parts)
+    occupies the units of its parts, any other area is a unit of its own.
+    Two areas can not be used at the same time if their units intersect.
+    """
+    def units(a, seen=()):
+        if a not in area_parts or a in seen:
+            return {a}
+        return set().union(*(units(a2, seen + (a,)) for a2 in area_parts[a]))
+    return {a: sorted(units(a)) for a in set(A) | set(area_parts)}
+
+
+def subset_data(data, activities):
+    """
+    The model inputs restricted to the given activities (conflicts and precedence within them only).
+    """
+    keep = set(activities)
+    E = [e for e in data['E'] if e in keep]
+    EXsubset = {e: data['EXsubset'][e] for e in E}
+    EX = [ex for e in E for ex in EXsubset[e]]
+    ex_keep = set(EX)
+    EDA = [(ex, d, a) for (ex, d, a) in data['EDA'] if ex in ex_keep]
+    CX = {e: [e2 for e2 in data['CX'][e] if e2 in keep] for e in E if e in data['CX']}
+    return {
+        **data,
+        'E': E, 'EXsubset': EXsubset, 'EX': EX,
+        'DX': {ex: data['DX'][ex] for ex in EX},
+        'EDA': EDA,
+        'UB': {idx: data['UB'][idx] for idx in EDA},
+        'LB': {idx: data['LB'][idx] for idx in EDA},
+        'CX': {e: v for e, v in CX.items() if v},
+        'undan_eftir': {e1: e2 for e1, e2 in data['undan_eftir'].items() if e1 in keep and e2 in keep},
+        'e_a': {e: v for e, v in data['e_a'].items() if e in keep},
+        'class_schedule': {e: v for e, v in data['class_schedule'].items() if e in keep},
+    }
+
+
+def interchangeable_exercises(data, index=None):
+    """
+    Classes of two or more exercises of the same activity with the same length and the same
+    (day, area, LB, UB) options. Any permutation of the exercises in a class is an equivalent schedule.
+    """
+    if index is None:
+        index = build_index(data)
+    EDA_ed = index['EDA_ed']
+    classes = []
+    for e in data['E']:
+        groups = {}
+        for ex in data['EXsubset'][e]:
+            options = tuple((d, a, data['LB'][ex, d, a], data['UB'][ex, d, a])
+                            for d in data['D'] for a in EDA_ed.get((ex, d), []))
+            groups.setdefault((data['DX'][ex], options), []).append(ex)
+        classes += [exs for (dx, options), exs in groups.items() if len(exs) > 1 and options]
+    return classes
+
+
+def order_interchangeable(data, schedule, classes):
+    """
+    The same schedule with the placements of each class of interchangeable exercises reassigned in
+    day order, so it satisfies the symmetry breaking constraints of build_model(symmetry=True).
+    """
+    schedule = dict(schedule)
+    day = {d: i for i, d in enumerate(data['D'])}
+    for exs in classes:
+        if all(ex in schedule for ex in exs):
+            placements = sorted((schedule[ex] for ex in exs), key=lambda p: day[p[0]])
+            schedule.update(zip(exs, placements))
+    return schedule
+
+
+def schedule_objective(data, schedule):
+    """
+    Objective of a schedule {ex: (d, a, start)}, as in build_model.
+    """
+    return sum(data['bias'].get(a, 1.0)*start for (d, a, start) in schedule.values())/len(data['EX'])
+
+
+def schedule_violations(data, schedule, index=None, eps=1e-6):
+    """
+    Constraints of the model a schedule {ex: (d, a, start)} breaks, as (kind, ...) tuples. Exercises
+    missing from the schedule are not counted.
+    """
+    if index is None:
+        index = build_index(data)
+    activity = {ex: e for e, exs in data['EXsubset'].items() for ex in exs}
+    DX, units = data['DX'], index['area_units']
+    violations = []
+    on_day = {}
+    cells = {}
+    for ex, (d, a, start) in schedule.items():
+        if (ex, d, a) not in index['EDA_set']:
+            violations.append(('placement', ex, d, a))
+            continue
+        if not data['LB'][ex, d, a] - eps <= start <= data['UB'][ex, d, a] + eps:
+            violations.append(('window', ex, d, a, start))
+        e = activity[ex]
+        if (e, d) in on_day:
+            violations.append(('day', on_day[e, d], ex, d))
+        on_day[e, d] = ex
+        for u in units.get(a, [a]):
+            cells.setdefault((d, u), []).append((start, start + DX[ex], ex))
+    for (d, u), intervals in cells.items():
+        intervals.sort()
+        last_end, last_ex = None, None
+        for start, end, ex in intervals:
+            if last_end is not None and start < last_end - eps:
+                violations.append(('overlap', last_ex, ex, d, u))
+            if last_end is None or end > last_end:
+                last_end, last_ex = end, ex
+    for e1, e2s in data['CX'].items():
+        for e2 in e2s:
+            for d in data['D']:
+                ex1, ex2 = on_day.get((e1, d)), on_day.get((e2, d))
+                if ex1 is None or ex2 is None or ex1 == ex2:
+                    continue
+                s1, s2 = schedule[ex1][2], schedule[ex2][2]
+                if s1 < s2 + DX[ex2] - eps and s2 < s1 + DX[ex1] - eps:
+                    violations.append(('conflict', ex1, ex2, d))
+    for e1, e2 in data['undan_eftir'].items():
+        for d in data['D']:
+            ex1, ex2 = on_day.get((e1, d)), on_day.get((e2, d))
+            if ex1 is not None and ex2 is not None and abs(schedule[ex1][2] + DX[ex1] - schedule[ex2][2]) > eps:
+                violations.append(('precedence', ex1, ex2, d))
+    return violations
+
+
+def build_index(data):
+    """
+    Sparse lookups over EDA and the (exercise, exercise) pairs that can actually collide.
+    """
+    D, EDA, EXsubset, CX = data['D'], data['EDA'], data['EXsubset'], data['CX']
+
+    # EDA_set: constant time membership tests
+    # EDA_da: which exercises can be placed in area a on day d
+    # EDA_ed: which areas exercise ex can use on day d
+    EDA_set = set(EDA)
+    EDA_da = {}
+    EDA_ed = {}
+    for (ex, d, a) in EDA:
+        EDA_da.setdefault((d, a), []).append(ex)
+        EDA_ed.setdefault((ex, d), []).append(a)
+
+    # EDA_du: which (exercise, area) pairs occupy physical unit u on day d
+    # EDA_edu: which areas of exercise ex on day d occupy physical unit u
+    units = area_units(data['area_parts'], data['A'])
+    EDA_du = {}
+    EDA_edu = {}
+    for (ex, d, a) in EDA:
+        for u in units.get(a, [a]):
+            EDA_du.setdefault((d, u), []).append((ex, a))
+            EDA_edu.setdefault((ex, d, u), []).append(a)
+
+    # Pairs that can actually collide: on the same physical unit on the same day. A pair whose areas
+    # on unit u are the same as on an earlier unit (e.g. both only in A-sal) gives the same disjunction
+    # and is kept once ...
+    unit_pairs = []
+    seen = set()
+    for (d, u), exa in EDA_du.items():
+        exs = list(dict.fromkeys(ex for (ex, a) in exa))
+        for e1 in exs:
+            for e2 in exs:
+                if e1 != e2:
+                    key = (e1, e2, d, tuple(EDA_edu[e1, d, u]), tuple(EDA_edu[e2, d, u]))
+                    if key not in seen:
+                        seen.add(key)
+                        unit_pairs.append((e1, e2, d, u))
+    # ... or conflicting exercises on the same day (any area)
+    conflict_pairs = [
+        (ex1, ex2, d)
+        for e1 in CX.keys() for ex1 in EXsubset.get(e1, [])
+        for e2 in CX[e1] for ex2 in EXsubset.get(e2, [])
+        for d in D if ex1 != ex2 and (ex1, d) in EDA_ed and (ex2, d) in EDA_ed
+    ]
+    ExE = {(e1, e2) for (e1, e2, d, u) in unit_pairs} | \
+          {(ex1, ex2) for (ex1, ex2, d) in conflict_pairs}
+
+    # Days on which both activities of a precedence pair can have an exercise
+    precedence_days = [
+        (e1, e2, d)
+        for e1, e2 in data['undan_eftir'].items() for d in D
+        if any((ex, d) in EDA_ed for ex in EXsubset[e1]) and any((ex, d) in EDA_ed for ex in EXsubset[e2])
+    ]
+
+    return {
+        'EDA_set': EDA_set, 'EDA_da': EDA_da, 'EDA_ed': EDA_ed,
+        'area_units': units, 'EDA_du': EDA_du, 'EDA_edu': EDA_edu,
+        'unit_pairs': unit_pairs,
+        'conflict_pairs': conflict_pairs, 'precedence_days': precedence_days,
+        'ExE': ExE,
+    }
+
+
+def model_size(data, index):
+    """
+    Model size counters, dense (every ordered pair) vs sparse.
+    """
+    n_ex, n_d = len(data['EX']), len(data['D'])
+    n_units = len({u for us in index['area_units'].values() for u in us})
+    return {
+        'EX': n_ex,
+        'EDA': len(data['EDA']),
+        'y_dense': n_ex*(n_ex-1),
+        'y_sparse': len(index['ExE']),
+        'unit_dense': n_ex*(n_ex-1)*n_d*n_units,
+        'unit_sparse': len(index['unit_pairs']),
+        'conflict': len(index['conflict_pairs']),
+        'precedence': len(index['precedence_days']),
+    }
+
+
+def print_model_size(size):
+    print("\n--- MODEL SIZE ---")
+    print(f"EX: {size['EX']}, EDA: {size['EDA']}")
+    print(f"y variables: {size['y_dense']} dense, {size['y_sparse']} sparse")
+    print(f"physical unit candidates: {size['unit_dense']} dense, {size['unit_sparse']} sparse")
+    print(f"conflict candidates: {size['conflict']}, precedence days: {size['precedence']}")
+
+
+def print_schedule(schedule, optimal=True):
+    print("\n--- OPTIMAL SCHEDULE ---" if optimal else "\n--- BEST SCHEDULE FOUND ---")
+    for ex, (d, a, start) in schedule.items():
+        print(f"Exercise {ex} scheduled on {d} in area {a} at time {start:.1f}")
@@ -0,0 +1,121 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from model.data import DB_URL, get_session, load_data, build_index, subset_data, schedule_objective, print_schedule
+from model.snapshot import load_cached
+from model.results import save_run
+
+
+def activity_of(data):
+    """
+    Map each exercise (subsession) to its activity.
+    """
+    return {ex: e for e, exs in data['EXsubset'].items() for ex in exs}
+
+
+def components(data, index=None):
+    """
+    Connected components of the interaction graph over activities. Two activities interact if they
+    can use the same physical unit (area, or part of a shared hall) on the same day, or through
+    a Conflict or Prerequisite row. Returned largest first.
+    """
+    if index is None:
+        index = build_index(data)
+    parent = {e: e for e in data['E']}
+
+    def find(e):
+        while parent[e] != e:
+            parent[e] = parent[parent[e]]
+            e = parent[e]
+        return e
+
+    def union(e1, e2):
+        r1, r2 = find(e1), find(e2)
+        if r1 != r2:
+            parent[r2] = r1
+
+    activity = activity_of(data)
+    for exa in index['EDA_du'].values():
+        for (ex, a) in exa[1:]:
+            union(activity[exa[0][0]], activity[ex])
+    for e1, e2s in data['CX'].items():
+        for e2 in e2s:
+            union(e1, e2)
+    for e1, e2 in data['undan_eftir'].items():
+        union(e1, e2)
+
+    groups = {}
+    for e in data['E']:
+        groups.setdefault(find(e), []).append(e)
+    return sorted(groups.values(), key=lambda g: -sum(len(data['EXsubset'][e]) for e in g))
+
+
+def solve_component(data, backend='gurobi', time_limit=None, threads=1, options=None):
+    """
+    Build and solve the model for one component. Runs in a worker process.
+    """
+    if backend == 'gurobi':
+        from model.run_gurobi import build_model, solve
+    else:
+        from model.run_ortools import build_model, solve
+    if not data['EX']:
+        return {}
+    model, vars = build_model(data, **(options or {}))
+    return solve(model, vars, time_limit, threads, log=False)
+
+
+def solve_decomposed(data, backend='gurobi', processes=None, time_limit=None, threads=1, options=None):
+    """
+    Solve each component of the interaction graph as its own model in a process pool and merge the
+    schedules. Returns (schedule, parts): the merged schedule {ex: (d, a, start)}, or None if any
+    component has no solution, and per component {'activities', 'exercises', 'solved'}, largest first.
+    """
+    parts = components(data)
+    subsets = [subset_data(data, part) for part in parts]
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        futures = [pool.submit(solve_component, sub, backend, time_limit, threads, options) for sub in subsets]
+        results = [f.result() for f in futures]
+    status = [{'activities': len(part), 'exercises': len(sub['EX']), 'solved': r is not None}
+              for part, sub, r in zip(parts, subsets, results)]
+    if any(r is None for r in results):
+        return None, status
+    schedule = {}
+    for r in results:
+        schedule.update(r)
+    return schedule, status
+
+
+def print_components(status):
+    unsolved = sum(not s['solved'] for s in status)
+    print(f"{len(status)} components, largest has {status[0]['activities'] if status else 0} activities"
+          f"{f', {unsolved} without a solution' if unsolved else ''}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve independent parts of the schedule in parallel.")
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--backend', choices=['gurobi', 'ortools'], default='gurobi')
+    parser.add_argument('--processes', type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument('--threads', type=int, default=1, help="solver threads per component")
+    parser.add_argument('--time-limit', type=float, default=None, help="time limit in seconds per component")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-read the database instead of using the compiled snapshot")
+    args = parser.parse_args()
+
+    db = get_session(args.db)
+    data = load_data(db) if args.no_cache else load_cached(db)
+    schedule, status = solve_decomposed(data, args.backend, args.processes, args.time_limit, args.threads)
+    print_components(status)
+    if schedule is None:
+        print("No solution found for some component.")
+    else:
+        print_schedule(schedule, optimal=args.time_limit is None)
+        print(f"Objective: {schedule_objective(data, schedule):.4f}")
+        print(f"Saved as schedule run {save_run(db, data, schedule, 'decompose', args.time_limit is None)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import time
+from bisect import bisect_left
+from model.data import DB_URL, get_session, load_data, area_units, schedule_objective, print_schedule
+from model.snapshot import load_cached
+
+
+class Timeline:
+    """
+    Busy intervals of one (day, physical unit) or (day, activity), sorted and non-overlapping.
+    """
+    def __init__(self):
+        self.starts = []
+        self.ends = []
+
+    def blocking(self, start, end):
+        """
+        End of an interval overlapping [start, end), or None if it is free.
+        """
+        i = bisect_left(self.starts, end) - 1
+        if i >= 0 and self.ends[i] > start:
+            return self.ends[i]
+        return None
+
+    def add(self, start, end):
+        i = bisect_left(self.starts, start)
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+
+
+def earliest_start(timelines, lb, ub, dx):
+    """
+    Earliest start in [lb, ub] at which [start, start + dx) is free on every timeline, or None.
+    """
+    start = lb
+    moved = True
+    while moved and start <= ub:
+        moved = False
+        for timeline in timelines:
+            end = timeline.blocking(start, start + dx)
+            if end is not None:
+                start = end
+                moved = True
+    return start if start <= ub else None
+
+
+def greedy_index(data):
+    """
+    The part of build_index the greedy uses (EDA_ed and area_units), without the pairwise sets that
+    dominate build_index on large instances.
+    """
+    EDA_ed = {}
+    for (ex, d, a) in data['EDA']:
+        EDA_ed.setdefault((ex, d), []).append(a)
+    return {'EDA_ed': EDA_ed, 'area_units': area_units(data['area_parts'], data['A'])}
+
+
+def greedy_schedule(data, index=None):
+    """
+    List scheduling: exercises with the fewest (day, area) options and tightest windows first, each
+    placed at the (day, area, start) with the lowest bias*start that keeps the schedule feasible
+    (physical units, conflicts, one exercise per activity and day, precedence back-to-back).
+    Returns the schedule {ex: (d, a, start)} of the exercises that could be placed.
+    index can be the full build_index or greedy_index (the default).
+    """
+    if index is None:
+        index = greedy_index(data)
+    EXsubset, DX, LB, UB, bias = data['EXsubset'], data['DX'], data['LB'], data['UB'], data['bias']
+    EDA_ed, units = index['EDA_ed'], index['area_units']
+    activity = {ex: e for e, exs in EXsubset.items() for ex in exs}
+
+    conflicts = {}
+    for e1, e2s in data['CX'].items():
+        for e2 in e2s:
+            if e1 != e2:
+                conflicts.setdefault(e1, set()).add(e2)
+                conflicts.setdefault(e2, set()).add(e1)
+    after = data['undan_eftir']
+    before = {}
+    for e1, e2 in after.items():
+        before.setdefault(e2, []).append(e1)
+
+    options = {ex: [(d, a) for d in data['D'] for a in EDA_ed.get((ex, d), [])] for ex in data['EX']}
+    slack = {ex: sum(UB[ex, d, a] - LB[ex, d, a] for (d, a) in options[ex]) for ex in data['EX']}
+    order = sorted(data['EX'], key=lambda ex: (len(options[ex]), slack[ex], -DX[ex]))
+
+    unit_busy = {}
+    activity_busy = {}
+    placed = {}  # (activity, day) -> (start, end)
+    schedule = {}
+    for ex in order:
+        e, dx = activity[ex], DX[ex]
+        best = None
+        for (d, a) in options[ex]:
+            if (e, d) in placed:
+                continue
+            lb, ub = LB[ex, d, a], UB[ex, d, a]
+            # back-to-back with a precedence partner already on this day
+            fixed = {placed[e0, d][1] for e0 in before.get(e, []) if (e0, d) in placed}
+            if (after.get(e), d) in placed:
+                fixed.add(placed[after[e], d][0] - dx)
+            if len(fixed) > 1:
+                continue
+            if fixed:
+                start = fixed.pop()
+                if not lb <= start <= ub:
+                    continue
+                lb = ub = start
+            timelines = [unit_busy.get((d, u)) for u in units.get(a, [a])]
+            timelines += [activity_busy.get((d, e2)) for e2 in conflicts.get(e, ())]
+            start = earliest_start([t for t in timelines if t is not None], lb, ub, dx)
+            if start is not None and (best is None or bias.get(a, 1.0)*start < best[0]):
+                best = (bias.get(a, 1.0)*start, d, a, start)
+        if best is None:
+            continue
+        _, d, a, start = best
+        for u in units.get(a, [a]):
+            unit_busy.setdefault((d, u), Timeline()).add(start, start + dx)
+        activity_busy.setdefault((d, e), Timeline()).add(start, start + dx)
+        placed[e, d] = (start, start + dx)
+        schedule[ex] = (d, a, start)
+    return schedule
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build a schedule with the greedy construction heuristic.")
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-read the database instead of using the compiled snapshot")
+    args = parser.parse_args()
+
+    db = get_session(args.db)
+    data = load_data(db) if args.no_cache else load_cached(db)
+    t0 = time.perf_counter()
+    schedule = greedy_schedule(data)
+    print(f"greedy: placed {len(schedule)} of {len(data['EX'])} exercises in {time.perf_counter() - t0:.3f}s")
+    print_schedule(schedule, optimal=False)
+    if len(schedule) == len(data['EX']):
+        print(f"Objective: {schedule_objective(data, schedule):.4f}")
+
+
+if __name__ == '__main__':
+    main()
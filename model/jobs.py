@@ -0,0 +1,250 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import shutil
+import sqlite3
+import tempfile
+import time
+from contextlib import closing
+from multiprocessing import get_context
+import pandas as pd
+from sqlalchemy import create_engine
+from model.data import get_session, load_data, build_index, schedule_objective
+from model.greedy import greedy_schedule
+from utils.import_activities import ensure_natural_keys, import_frame
+
+JOBS_DB = '.nsn_jobs.db'
+# Seconds between progress writes to the job table, the solver callbacks fire much more often
+PROGRESS_INTERVAL = 0.5
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    owner TEXT,
+    status TEXT NOT NULL,           -- queued, running, done, no_solution, failed
+    backend TEXT NOT NULL,
+    time_limit REAL,
+    threads INTEGER,
+    input TEXT NOT NULL,            -- the edited table, DataFrame.to_json(orient='split')
+    objective REAL,
+    bound REAL,
+    gap REAL,
+    elapsed REAL,
+    result TEXT,                    -- JSON list of [ex, activity, day, area, start, end]
+    error TEXT,
+    created REAL NOT NULL,
+    started REAL,
+    finished REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status ON jobs (status, job_id);
+CREATE INDEX IF NOT EXISTS ix_jobs_owner ON jobs (owner, job_id);
+"""
+
+
+def connect(path=JOBS_DB):
+    conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+    conn.row_factory = sqlite3.Row
+    return conn
+
+
+def init(path=JOBS_DB):
+    """
+    Create the job table. WAL lets the page read progress while a worker writes it.
+    """
+    with closing(connect(path)) as conn:
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.executescript(SCHEMA)
+
+
+def submit(df, backend='gurobi', time_limit=60, threads=1, owner=None, path=JOBS_DB):
+    """
+    Queue a solve of an activity table (the columns of the activity sheet). Returns the job id.
+    """
+    with closing(connect(path)) as conn:
+        cur = conn.execute(
+            "INSERT INTO jobs (owner, status, backend, time_limit, threads, input, created) VALUES (?, 'queued', ?, ?, ?, ?, ?)",
+            (owner, backend, time_limit, threads, df.to_json(orient='split', force_ascii=False), time.time())
+        )
+        return cur.lastrowid
+
+
+def get_job(job_id, path=JOBS_DB):
+    with closing(connect(path)) as conn:
+        row = conn.execute("SELECT * FROM jobs WHERE job_id = ?", (job_id,)).fetchone()
+    return dict(row) if row is not None else None
+
+
+def list_jobs(owner=None, limit=20, path=JOBS_DB):
+    """
+    The latest jobs (of one owner, or all), newest first, without their input tables.
+    """
+    columns = "job_id, owner, status, backend, time_limit, objective, bound, gap, elapsed, error, created, started, finished"
+    with closing(connect(path)) as conn:
+        if owner is None:
+            rows = conn.execute(f"SELECT {columns} FROM jobs ORDER BY job_id DESC LIMIT ?", (limit,))
+        else:
+            rows = conn.execute(f"SELECT {columns} FROM jobs WHERE owner = ? ORDER BY job_id DESC LIMIT ?", (owner, limit))
+        return [dict(r) for r in rows]
+
+
+def claim(path=JOBS_DB):
+    """
+    Take the oldest queued job and mark it running. Returns its id, or None if the queue is empty.
+    """
+    with closing(connect(path)) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        row = conn.execute("SELECT job_id FROM jobs WHERE status = 'queued' ORDER BY job_id LIMIT 1").fetchone()
+        if row is not None:
+            conn.execute("UPDATE jobs SET status = 'running', started = ? WHERE job_id = ?", (time.time(), row[0]))
+        conn.execute("COMMIT")
+    return row[0] if row is not None else None
+
+
+def finish(job_id, status, result=None, error=None, path=JOBS_DB):
+    with closing(connect(path)) as conn:
+        conn.execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished = ? WHERE job_id = ?",
+            (status, json.dumps(result, ensure_ascii=False) if result is not None else None, error, time.time(), job_id)
+        )
+
+
+def relative_gap(objective, bound):
+    if objective is None or bound is None:
+        return None
+    return abs(objective - bound)/max(abs(objective), 1e-10)
+
+
+class Progress:
+    """
+    progress(objective, bound, elapsed, nodes) for solve(), written to the job row on each new incumbent
+    and otherwise at most every PROGRESS_INTERVAL seconds.
+    """
+    def __init__(self, job_id, path=JOBS_DB):
+        self.job_id = job_id
+        self.path = path
+        self.objective = None
+        self.written = 0.0
+
+    def __call__(self, objective, bound, elapsed, nodes=None):
+        now = time.time()
+        if objective == self.objective and now - self.written < PROGRESS_INTERVAL:
+            return
+        self.objective = objective
+        self.written = now
+        with closing(connect(self.path)) as conn:
+            conn.execute(
+                "UPDATE jobs SET objective = ?, bound = ?, gap = ?, elapsed = ? WHERE job_id = ?",
+                (objective, bound, relative_gap(objective, bound), elapsed, self.job_id)
+            )
+
+
+def load_table(df):
+    """
+    The model inputs for an activity table, through the importer into a scratch database.
+    """
+    tmpdir = tempfile.mkdtemp()
+    try:
+        db_url = 'sqlite:///' + os.path.join(tmpdir, 'job.db')
+        engine = create_engine(db_url)
+        with engine.begin() as conn:
+            ensure_natural_keys(conn)
+            import_frame(conn, df)
+        engine.dispose()
+        db = get_session(db_url)
+        data = load_data(db)
+        db.close()
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return data
+
+
+def result_rows(data, schedule):
+    """
+    A schedule {ex: (d, a, start)} as the rows stored in the job table: [ex, activity, day, area, start, end].
+    """
+    activity = {ex: e for e, exs in data['EXsubset'].items() for ex in exs}
+    return [[ex, activity[ex], d, a, start, start + data['DX'][ex]] for ex, (d, a, start) in schedule.items()]
+
+
+def preview(df):
+    """
+    Greedy schedule of an activity table, without a solver. Returns (rows as in result_rows, unplaced exercises).
+    """
+    data = load_table(df)
+    schedule = greedy_schedule(data)
+    return result_rows(data, schedule), [ex for ex in data['EX'] if ex not in schedule]
+
+
+def run_job(job_id, path=JOBS_DB):
+    """
+    Build and solve one job, starting from the greedy schedule, and store the schedule (or the error) in the job row.
+    """
+    job = get_job(job_id, path)
+    progress = Progress(job_id, path)
+    try:
+        if job['backend'] == 'gurobi':
+            from model.run_gurobi import build_model, solve
+            from model.warmstart import schedule_start as set_start
+        else:
+            from model.run_ortools import build_model, solve
+            from model.warmstart import schedule_hint as set_start
+        data = load_table(pd.DataFrame(**json.loads(job['input'])))
+        index = build_index(data)
+        model, vars = build_model(data, index)
+        greedy = greedy_schedule(data, index)
+        set_start(model, vars, greedy, data, index)
+        if len(greedy) == len(data['EX']):
+            progress(schedule_objective(data, greedy), None, 0.0)
+        schedule = solve(model, vars, job['time_limit'], job['threads'] or 1, log=False, progress=progress)
+    except Exception as exc:
+        finish(job_id, 'failed', error=f'{type(exc).__name__}: {exc}', path=path)
+        return
+    if schedule is None:
+        finish(job_id, 'no_solution', path=path)
+        return
+    finish(job_id, 'done', result_rows(data, schedule), path=path)
+
+
+def work(path=JOBS_DB, poll=1.0):
+    """
+    Worker loop: run queued jobs one at a time, forever.
+    """
+    while True:
+        job_id = claim(path)
+        if job_id is None:
+            time.sleep(poll)
+        else:
+            run_job(job_id, path)
+
+
+def start_workers(n=2, path=JOBS_DB):
+    """
+    Start n worker processes on the job table. They stop with the process that started them, so jobs
+    still marked running were left by workers that died and are queued again first.
+    """
+    init(path)
+    with closing(connect(path)) as conn:
+        conn.execute("UPDATE jobs SET status = 'queued', started = NULL WHERE status = 'running'")
+    workers = []
+    for _ in range(n):
+        p = get_context('spawn').Process(target=work, args=(path,), daemon=True)
+        p.start()
+        workers.append(p)
+    return workers
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run queued optimisation jobs from the job table.")
+    parser.add_argument('--jobs-db', default=JOBS_DB, help="SQLite file with the job table")
+    parser.add_argument('--workers', type=int, default=2, help="jobs solved at the same time")
+    args = parser.parse_args()
+
+    for p in start_workers(args.workers, args.jobs_db):
+        p.join()
+
+
+if __name__ == '__main__':
+    main()
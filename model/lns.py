@@ -0,0 +1,201 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor
+from model.data import (DB_URL, get_session, load_data, build_index, subset_data, schedule_objective,
+                        schedule_violations, print_schedule)
+from model.snapshot import load_cached
+from model.greedy import greedy_schedule
+from model.warmstart import load_solution
+from model.results import save_run
+
+NEIGHBOURHOODS = ['area-day', 'club', 'conflict']
+
+
+def score(data, schedule):
+    """
+    (unplaced exercises, objective): smaller is better, so a partial start is completed first.
+    """
+    return len(data['EX']) - len(schedule), schedule_objective(data, schedule)
+
+
+def pick_neighbourhood(data, index, schedule, kind, size, rng):
+    """
+    Exercises to free: those placed on one (day, physical unit), the activities of one club,
+    or one cluster of activities linked by conflicts and precedence. At most size exercises.
+    """
+    activity = {ex: e for e, exs in data['EXsubset'].items() for ex in exs}
+    units = index['area_units']
+    if kind == 'area-day' and schedule:
+        d, a, start = schedule[rng.choice(sorted(schedule))]
+        cells = {(d, u) for u in units.get(a, [a])}
+        free = [ex for ex, (d2, a2, s2) in schedule.items() if any((d2, u) in cells for u in units.get(a2, [a2]))]
+    elif kind == 'club':
+        clubs = sorted({c for c in data['club'].values() if c is not None})
+        club = rng.choice(clubs) if clubs else None
+        activities = [e for e in data['E'] if data['club'].get(e) == club]
+        rng.shuffle(activities)
+        free = [ex for e in activities for ex in data['EXsubset'][e]]
+    else:
+        links = {}
+        for e1, e2s in data['CX'].items():
+            for e2 in e2s:
+                links.setdefault(e1, set()).add(e2)
+                links.setdefault(e2, set()).add(e1)
+        for e1, e2 in data['undan_eftir'].items():
+            links.setdefault(e1, set()).add(e2)
+            links.setdefault(e2, set()).add(e1)
+        seed = rng.choice(sorted(links) or data['E'])
+        cluster, queue = [], [seed]
+        while queue and sum(len(data['EXsubset'][e]) for e in cluster) < size:
+            e = queue.pop(0)
+            if e not in cluster:
+                cluster.append(e)
+                queue.extend(sorted(links.get(e, ())))
+        free = [ex for e in cluster for ex in data['EXsubset'][e]]
+    # unplaced exercises of the freed activities are free as well
+    freed = {activity[ex] for ex in free[:size]}
+    return set(free[:size]) | {ex for e in freed for ex in data['EXsubset'][e] if ex not in schedule}
+
+
+def sub_problem(data, index, schedule, free):
+    """
+    The model inputs for re-optimising the free exercises: their activities and every activity that can
+    interact with them, where the exercises that are not free are fixed at their (d, a, start).
+    """
+    activity = {ex: e for e, exs in data['EXsubset'].items() for ex in exs}
+    units = index['area_units']
+    cells = {(d, u) for (ex, d, a) in data['EDA'] if ex in free for u in units.get(a, [a])}
+    keep = {activity[ex] for ex in free}
+    for ex, (d, a, start) in schedule.items():
+        if any((d, u) in cells for u in units.get(a, [a])):
+            keep.add(activity[ex])
+    for e1, e2s in data['CX'].items():
+        for e2 in e2s:
+            if e1 in keep or e2 in keep:
+                keep.update((e1, e2))
+    for e1, e2 in data['undan_eftir'].items():
+        if e1 in keep or e2 in keep:
+            keep.update((e1, e2))
+    sub = subset_data(data, keep)
+    EDA = [(ex, d, a) for (ex, d, a) in sub['EDA']
+           if ex in free or (ex in schedule and schedule[ex][:2] == (d, a))]
+    fixed = {(ex, d, a): schedule[ex][2] for (ex, d, a) in EDA if ex not in free}
+    # exercises that are neither free nor placed have no EDA entry left, drop them
+    placeable = {ex for (ex, d, a) in EDA}
+    EX = [ex for ex in sub['EX'] if ex in placeable]
+    return {
+        **sub,
+        'EX': EX,
+        'EXsubset': {e: [ex for ex in exs if ex in placeable] for e, exs in sub['EXsubset'].items()},
+        'DX': {ex: sub['DX'][ex] for ex in EX},
+        'EDA': EDA,
+        'LB': {idx: fixed.get(idx, sub['LB'][idx]) for idx in EDA},
+        'UB': {idx: fixed.get(idx, sub['UB'][idx]) for idx in EDA},
+    }
+
+
+def solve_neighbourhood(sub, schedule, backend='gurobi', time_limit=5, threads=1):
+    """
+    Solve one sub-problem from the current schedule. Runs in a worker process.
+    """
+    if backend == 'gurobi':
+        from model.run_gurobi import build_model, solve
+        from model.warmstart import schedule_start as set_start
+    else:
+        from model.run_ortools import build_model, solve
+        from model.warmstart import schedule_hint as set_start
+    index = build_index(sub)
+    model, vars = build_model(sub, index)
+    set_start(model, vars, {ex: v for ex, v in schedule.items() if ex in sub['DX']}, sub, index)
+    return solve(model, vars, time_limit, threads, log=False)
+
+
+def lns(data, schedule=None, backend='gurobi', time_limit=60, sub_time_limit=5, processes=4, size=40,
+        kinds=NEIGHBOURHOODS, seed=0, threads=1):
+    """
+    Large neighbourhood search from a schedule (the greedy schedule if None). Each round frees up to
+    processes disjoint neighbourhoods, re-solves them in parallel worker processes with everything
+    else fixed and accepts the improvements that are still feasible together, best first.
+    Returns (schedule, trace) where trace is a list of {'elapsed', 'round', 'unplaced', 'objective'}.
+    """
+    rng = random.Random(seed)
+    index = build_index(data)
+    if schedule is None:
+        schedule = greedy_schedule(data, index)
+    schedule = {ex: (d, a, start) for ex, (d, a, start) in schedule.items() if (ex, d, a) in index['EDA_set']}
+    t0 = time.perf_counter()
+    best = score(data, schedule)
+    trace = [{'elapsed': 0.0, 'round': 0, 'unplaced': best[0], 'objective': best[1]}]
+    n_round = 0
+    with ProcessPoolExecutor(max_workers=processes) as pool:
+        while time.perf_counter() - t0 < time_limit:
+            n_round += 1
+            taken = set()
+            futures = []
+            for i in range(processes):
+                free = pick_neighbourhood(data, index, schedule, kinds[(n_round + i) % len(kinds)], size, rng)
+                if not free or free & taken:
+                    continue
+                taken |= free
+                sub = sub_problem(data, index, schedule, free)
+                futures.append((free, pool.submit(solve_neighbourhood, sub, schedule, backend, sub_time_limit, threads)))
+            candidates = []
+            for free, future in futures:
+                result = future.result()
+                if result is None:
+                    continue
+                moved = {ex: v for ex, v in result.items() if ex in free}
+                candidate = {ex: v for ex, v in schedule.items() if ex not in free}
+                candidate.update(moved)
+                candidates.append((score(data, candidate), moved, free))
+            for _, moved, free in sorted(candidates, key=lambda c: c[0]):
+                # re-scored against the schedule with the better neighbourhoods of this round applied
+                candidate = {ex: v for ex, v in schedule.items() if ex not in free}
+                candidate.update(moved)
+                s = score(data, candidate)
+                if s < best and not schedule_violations(data, candidate, index):
+                    schedule, best = candidate, s
+            trace.append({'elapsed': round(time.perf_counter() - t0, 3), 'round': n_round,
+                          'unplaced': best[0], 'objective': best[1]})
+    return schedule, trace
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Improve a schedule by large neighbourhood search.")
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-read the database instead of using the compiled snapshot")
+    parser.add_argument('--backend', choices=['gurobi', 'ortools'], default='gurobi')
+    parser.add_argument('--start', default=None, help="JSON solution file to start from (default: greedy schedule)")
+    parser.add_argument('--time-limit', type=float, default=60, help="total time limit in seconds")
+    parser.add_argument('--sub-time-limit', type=float, default=5, help="time limit in seconds per neighbourhood")
+    parser.add_argument('--processes', type=int, default=4, help="neighbourhoods solved in parallel")
+    parser.add_argument('--size', type=int, default=40, help="exercises freed per neighbourhood")
+    parser.add_argument('--kinds', nargs='+', choices=NEIGHBOURHOODS, default=NEIGHBOURHOODS)
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--trace', default=None, help="append the objective-over-time trace as JSON lines to this file")
+    args = parser.parse_args()
+
+    db = get_session(args.db)
+    data = load_data(db) if args.no_cache else load_cached(db)
+    start = load_solution(args.start)['schedule'] if args.start else None
+    schedule, trace = lns(data, start, args.backend, args.time_limit, args.sub_time_limit,
+                          args.processes, args.size, args.kinds, args.seed)
+    for t in trace:
+        print(f"{t['elapsed']:>8.2f}s  round {t['round']:>4}  unplaced {t['unplaced']:>4}  objective {t['objective']:.4f}")
+    if args.trace:
+        with open(args.trace, 'a') as f:
+            for t in trace:
+                f.write(json.dumps({'backend': args.backend, **t}) + '\n')
+    print_schedule(schedule, optimal=False)
+    print(f"Saved as schedule run {save_run(db, data, schedule, 'lns')}")
+
+
+if __name__ == '__main__':
+    main()
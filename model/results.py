@@ -0,0 +1,52 @@
+import datetime
+import pandas as pd
+from sqlalchemy import insert, select, func
+from database.models import ScheduleRun, Assignment
+from model.data import schedule_objective
+
+ASSIGNMENT_COLUMNS = ['exercise_id', 'activity_id', 'day_of_week', 'area_id', 'start', 'end']
+
+
+def ensure_result_tables(db):
+    """
+    Create the schedule_runs and assignments tables on databases from before they existed.
+    """
+    for table in (ScheduleRun.__table__, Assignment.__table__):
+        table.create(db.get_bind(), checkfirst=True)
+
+
+def save_run(db, data, schedule, method, optimal=False):
+    """
+    Store a schedule {ex: (d, a, start)} as a new run, with its assignments inserted in bulk. Returns the run id.
+    """
+    ensure_result_tables(db)
+    run = ScheduleRun(created=datetime.datetime.now(), method=method, status='optimal' if optimal else 'feasible',
+                      objective=schedule_objective(data, schedule) if schedule else None)
+    db.add(run)
+    db.flush()
+    activity = {ex: e for e, exs in data['EXsubset'].items() for ex in exs}
+    records = [
+        {'run_id': run.run_id, 'exercise_id': ex, 'activity_id': activity[ex], 'day_of_week': d, 'area_id': a,
+         'start': start, 'end': start + data['DX'][ex]}
+        for ex, (d, a, start) in schedule.items()
+    ]
+    if records:
+        db.execute(insert(Assignment.__table__), records)
+    db.commit()
+    return run.run_id
+
+
+def latest_run_id(db):
+    ensure_result_tables(db)
+    return db.execute(select(func.max(ScheduleRun.run_id))).scalar()
+
+
+def load_run(db, run_id=None):
+    """
+    Assignments of a run (the latest if run_id is None) as a DataFrame with ASSIGNMENT_COLUMNS.
+    """
+    if run_id is None:
+        run_id = latest_run_id(db)
+    table = Assignment.__table__
+    query = select(*(table.c[c] for c in ASSIGNMENT_COLUMNS)).where(table.c.run_id == run_id)
+    return pd.read_sql(query, db.get_bind())
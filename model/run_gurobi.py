@@ -2,209 +2,324 @@ import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from database.models import Activity, Area, Session as DbSession, Conflict, Prerequisite
+import argparse
 import gurobipy as gp
 from gurobipy import GRB
+from model.data import (DB_URL, get_session, load_data, build_index, interchangeable_exercises, order_interchangeable,
+                        schedule_violations, model_size, print_model_size, print_schedule)
+from model.snapshot import load_cached
+from model.warmstart import load_solution, save_solution, apply_start, schedule_start
+from model.greedy import greedy_schedule
+from model.results import save_run
+from model.telemetry import Telemetry, PhaseClock, gurobi_results
+from model.bigm import disjunction_list, window, disjunction_bigm, fixed_orders, precedence_bigm
 
-# --- Connect to DB ---
-engine = create_engine('sqlite:///sports_schedule.db')
-SessionLocal = sessionmaker(bind=engine)
-db = SessionLocal()
-
-# --- Read Data from DB ---
-activities = db.query(Activity).all()
-E = [a.activity_id for a in activities]
-
-D = ['sun', 'mán', 'þri', 'mið', 'fim', 'fös', 'lau']
-Dw = ['sun', 'lau']
-areas = db.query(Area).all()
-A = [a.area_id for a in areas]
-
-db_sessions = db.query(DbSession).all()
-
-# e_a: which areas are allowed for each activity
-e_a = {}
-for s in db_sessions:
-    e_a.setdefault(s.activity_id, set()).add(s.area_id)
-
-# class_schedule: for each activity, which days have what time ranges
-class_schedule = {}
-for s in db_sessions:
-    class_schedule.setdefault(s.activity_id, {})[s.day_of_week] = (s.min_start, s.max_end)
-
-# number_exercises: lengths and group counts
-number_exercises = {}
-for a in activities:
-    l_str = a.length_str or ''
-    l_wknd_str = a.length_weekend_str or ''
-    lengd = [float(x.strip()) for x in l_str.split(',') if x.strip()] if l_str else []
-    lengd_helgar = [float(x.strip()) for x in l_wknd_str.split(',') if x.strip()] if l_wknd_str else []
-    number_exercises[a.activity_id] = [lengd, lengd_helgar, a.groups_count or 1]
-
-# EXsubset and DXsubset
-EXsubset = {}
-DXsubset = {}
-for e in E:
-    EXsubset[e] = [e + " - " + str(i+1) for i in range(len(number_exercises[e][0]))] + \
-                  [e + " * " + str(i+1) for i in range(len(number_exercises[e][1]))]
-    DXsubset[e] = [dx*number_exercises[e][2] for dx in number_exercises[e][0]] + \
-                  [dx*number_exercises[e][2] for dx in number_exercises[e][1]]
-EX = [item for sublist in EXsubset.values() for item in sublist]
-DX_values = [value for sublist in DXsubset.values() for value in sublist]
-DX = dict(zip(EX, DX_values))
-
-# --- Build EDA, UB, LB, CX ---
-EDA = []
-UB = {}
-LB = {}
-CX = {}
-for e in E:
-    for d in D:
-        for a_ in e_a.get(e, []):
-            if d in class_schedule[e].keys():
-                for ex in EXsubset[e]:
-                    if d in Dw and '*' in ex:
-                        EDA.append((ex, d, a_))
-                    if d not in Dw and '*' not in ex:
-                        EDA.append((ex, d, a_))
-                    ub_val = class_schedule[e][d][1]
-                    lb_val = class_schedule[e][d][0]
-                    if ub_val is None:
-                        ub_val = 24*60  # or another max value
-                    if lb_val is None:
-                        lb_val = 0
-                    UB[(ex, d, a_)] = float(ub_val)
-                    LB[(ex, d, a_)] = float(lb_val)
-
-# Conflicts (build CX mapping each activity to conflicting activity subsessions)
-conflict_dict = {}
-conflicts = db.query(Conflict).all()
-for c in conflicts:
-    conflict_dict.setdefault(c.activity_id, []).append(c.conflict_activity_id)
-for e in E:
-    if e in conflict_dict.keys():
-        tmp = [EXsubset[e_] for e_ in conflict_dict[e] if e_ in EXsubset.keys()]
-        if len(tmp) > 0:
-            CX[e] = tmp[0]
-
-# Precedence (fyrir/undan)
-undan_eftir = {}
-prereqs = db.query(Prerequisite).all()
-for p in prereqs:
-    undan_eftir[p.activity_id] = p.must_be_before_activity_id
-
-# Areas that should not overlap (ekki_deila_svaedi)
-ekki_deila_svaedi = {
-    'A-sal': ['1/3 A-sal-1', '1/3 A-sal-2', '1/3 A-sal-3', '2/3 A-sal'],
-    '2/3 A-sal': ['1/3 A-sal-1', '1/3 A-sal-2']
-}
-
-# --- Gurobi Model and Variables ---
-model = gp.Model()
-x = model.addVars(EDA, ub=UB)
-z = model.addVars(EDA, vtype="B")
-M = 24*60
-ExE = {(EX[i], EX[j]) for i in range(len(EX)) for j in range(len(EX)) if i != j}
-y = model.addVars(ExE, vtype="B")
-q = model.addVars(E, range(len(D)))
-c = model.addVars(EDA, vtype="B")
-
-# --- Constraints ---
-
-# if the exercise ex is on day d in area a then it should start after LB
-model.addConstrs(z[ex, d, a]*LB[(ex, d, a)] <= x[ex, d, a] for (ex, d, a) in EDA)
-# if not scheduled, force time to 0
-model.addConstrs(x[ex, d, a] <= UB[(ex, d, a)]*z[ex, d, a] for (ex, d, a) in EDA)
-# each exercise performed somewhere just once
-model.addConstrs(gp.quicksum(z[ex, d, a] for d in D for a in A if (ex, d, a) in EDA) == 1 for ex in EX)
-# only once per day or not at all
-model.addConstrs(gp.quicksum(z[ex, d, a] for ex in EXsubset[e] for a in A if (ex, d, a) in EDA) <= 1 for d in D for e in E)
-# no overlap in exercises if at same location
-model.addConstrs(
-    x[e1, d, a] + DX[e1] <= x[e2, d, a] + M*(1-z[e1, d, a]) + M*(1-z[e2, d, a]) + M*y[e1, e2]
-    for (e1, e2) in ExE for d in D for a in A if (e1, d, a) in EDA and (e2, d, a) in EDA
-)
-model.addConstrs(
-    x[e2, d, a] + DX[e2] <= x[e1, d, a] + M*(1-z[e1, d, a]) + M*(1-z[e2, d, a]) + M*(1-y[e1, e2])
-    for (e1, e2) in ExE for d in D for a in A if (e1, d, a) in EDA and (e2, d, a) in EDA
-)
-# Overlapping area should not be at the same time (not just day for A-sal)
-model.addConstrs(
-    x[e1, d, a1] + DX[e1] <= x[e2, d, a2] + M*(1-z[e1, d, a1]) + M*(1-z[e2, d, a2]) + M*y[e1, e2]
-    for (e1, e2) in ExE for d in D for a1 in ekki_deila_svaedi.keys() for a2 in ekki_deila_svaedi[a1]
-    if (e1, d, a1) in EDA and (e2, d, a2) in EDA
-)
-model.addConstrs(
-    x[e2, d, a2] + DX[e2] <= x[e1, d, a1] + M*(1-z[e1, d, a1]) + M*(1-z[e2, d, a2]) + M*(1-y[e1, e2])
-    for (e1, e2) in ExE for d in D for a1 in ekki_deila_svaedi.keys() for a2 in ekki_deila_svaedi[a1]
-    if (e1, d, a1) in EDA and (e2, d, a2) in EDA
-)
-
-# ---- FIXED: Árekstur (conflict) constraints ----
-for e1 in CX.keys():
-    for ex1 in EXsubset.get(e1, []):
-        for e2_name in CX[e1]:
-            for ex2 in EXsubset.get(e2_name, []):
-                if ex1 == ex2: continue
-                for d in D:
-                    x1_inds = [(ex1, d, a) for a in A if (ex1, d, a) in EDA]
-                    x2_inds = [(ex2, d, a) for a in A if (ex2, d, a) in EDA]
-                    if not x1_inds or not x2_inds: continue
-                    model.addConstr(
-                        gp.quicksum(x[idx] for idx in x1_inds) + DX[ex1] <=
-                        gp.quicksum(x[idx] for idx in x2_inds)
-                        + M*(1-gp.quicksum(z[idx] for idx in x1_inds))
-                        + M*(1-gp.quicksum(z[idx] for idx in x2_inds))
-                        + M*y[ex1, ex2]
-                    )
-                    model.addConstr(
-                        gp.quicksum(x[idx] for idx in x2_inds) + DX[ex2] <=
-                        gp.quicksum(x[idx] for idx in x1_inds)
-                        + M*(1-gp.quicksum(z[idx] for idx in x1_inds))
-                        + M*(1-gp.quicksum(z[idx] for idx in x2_inds))
-                        + M*(1-y[ex1, ex2])
-                    )
-
-# Only allowed days/areas per activity
-for (e, a) in [(k[0], k[1]) for k in class_schedule.keys() for k2 in e_a.get(k, [])]:
-    if (e, a) in class_schedule.keys():
-        allowed_days = set(class_schedule[e].keys())
-        model.addConstr(
-            gp.quicksum(z[ex, d, a] for d in D for ex in EXsubset[e] if (ex, d, a) in EDA and d not in allowed_days) == 0
-        )
-# Precedence constraints
-model.addConstrs(
-    gp.quicksum(x[ex, d, a] + DX[ex]*z[ex, d, a] for ex in EXsubset[e1] for a in A if (ex, d, a) in EDA) <=
-    gp.quicksum(x[ex, d, a] for ex in EXsubset[e2] for a in A if (ex, d, a) in EDA)
-    + M*(1-gp.quicksum(z[ex, d, a] for ex in EXsubset[e1] for a in A if (ex, d, a) in EDA))
-    + M*(1-gp.quicksum(z[ex, d, a] for ex in EXsubset[e2] for a in A if (ex, d, a) in EDA))
-    for d in D for e1 in undan_eftir.keys() for e2 in [undan_eftir[e1]]
-)
-model.addConstrs(
-    gp.quicksum(x[ex, d, a] + DX[ex]*z[ex, d, a] for ex in EXsubset[e1] for a in A if (ex, d, a) in EDA) >=
-    gp.quicksum(x[ex, d, a] for ex in EXsubset[e2] for a in A if (ex, d, a) in EDA)
-    - M*(1-gp.quicksum(z[ex, d, a] for ex in EXsubset[e1] for a in A if (ex, d, a) in EDA))
-    - M*(1-gp.quicksum(z[ex, d, a] for ex in EXsubset[e2] for a in A if (ex, d, a) in EDA))
-    for d in D for e1 in undan_eftir.keys() for e2 in [undan_eftir[e1]]
-)
-# Objective: minimize sum of q + bias for early/late/area usage
-bias = {a: 1.0 for a in A}
-bias['1/3 A-sal-1'] = 1.02
-bias['1/3 A-sal-2'] = 1.01
-model.setObjective(
-    100*gp.quicksum(q[e, i] for e in E for i in range(len(D))) +
-    (1/len(EX))*gp.quicksum(bias[a]*x[ex, d, a] for (ex, d, a) in EDA),
-    GRB.MINIMIZE
-)
-model.optimize()
-
-# Output results
-if model.status == GRB.OPTIMAL:
-    print("\n--- OPTIMAL SCHEDULE ---")
-    for (ex, d, a) in EDA:
-        if z[ex, d, a].X > 0.5:
-            print(f"Exercise {ex} scheduled on {d} in area {a} at time {x[ex, d, a].X:.1f}")
-else:
-    print("No optimal solution found.")
+
+def build_model(data, index=None, bigm='global', aggregate=False, symmetry=False, lazy=False):
+    """
+    Build the Gurobi model for the inputs from load_data. Returns (model, vars).
+
+    bigm='global' uses M = 24*60 in every disjunction. bigm='tight' computes the big-M values of each
+    disjunction from the [LB, UB] windows and DX, drops disjunctions whose windows can not overlap and
+    fixes y when only one order is possible.
+
+    aggregate=True adds a start xd and an indicator zd per (exercise, day) that can use more than one
+    area, linked once to x and z. The conflict and precedence constraints use those instead of
+    summing x and z over the areas in every constraint.
+
+    symmetry=True orders interchangeable exercises of an activity (same length and options) by day,
+    so branch-and-bound does not explore their permutations.
+
+    lazy=True leaves the physical unit disjunctions out of the model. solve() adds the ones a new
+    incumbent violates as lazy constraints from a MIPSOL callback. Gurobi can not add variables
+    during optimize, so y is still created up front, as columns without rows.
+
+    vars['stats'] holds the time and peak memory of each build phase and the rows added per block
+    (overlap on the same area, shared hall parts, conflict, precedence).
+    """
+    if index is None:
+        index = build_index(data)
+    E, D, EX, EXsubset, DX = data['E'], data['D'], data['EX'], data['EXsubset'], data['DX']
+    EDA, UB, LB, bias = data['EDA'], data['UB'], data['LB'], data['bias']
+    EDA_ed = index['EDA_ed']
+    M = 24*60
+    stats = {}
+    clock = PhaseClock(stats, 'build_')
+    rows = {'overlap': 0, 'shared_hall': 0, 'conflict': 0, 'precedence': 0}
+
+    # --- Big-M values for each disjunction ---
+    disjunctions = disjunction_list(index)
+    if bigm == 'tight':
+        bigms = [disjunction_bigm(window(data, ix1), DX[e1], window(data, ix2), DX[e2])
+                 for (e1, e2, block, ix1, ix2) in disjunctions]
+        fixed, ExE = fixed_orders(disjunctions, bigms)
+    else:
+        bigms = [((M, M, M), (M, M, M), 'free')]*len(disjunctions)
+        fixed, ExE = {}, index['ExE']
+    clock.lap('bigm')
+
+    # --- Gurobi Model and Variables ---
+    model = gp.Model()
+    x = model.addVars(EDA, ub=UB)
+    z = model.addVars(EDA, vtype="B")
+    y = model.addVars(ExE, vtype="B")
+    q = model.addVars(E, range(len(D)))
+    c = model.addVars(EDA, vtype="B")
+    for p, order in fixed.items():
+        y[p].lb = y[p].ub = order
+    # start and indicator of exercise ex on day d, over all its areas
+    xd, zd = {}, {}
+    for (ex, d), areas in EDA_ed.items():
+        if len(areas) == 1:
+            xd[ex, d], zd[ex, d] = x[ex, d, areas[0]], z[ex, d, areas[0]]
+        elif aggregate:
+            xd[ex, d] = model.addVar(ub=max(UB[ex, d, a] for a in areas))
+            zd[ex, d] = model.addVar(ub=1)
+            model.addConstr(xd[ex, d] == gp.quicksum(x[ex, d, a] for a in areas))
+            model.addConstr(zd[ex, d] == gp.quicksum(z[ex, d, a] for a in areas))
+        else:
+            xd[ex, d] = gp.quicksum(x[ex, d, a] for a in areas)
+            zd[ex, d] = gp.quicksum(z[ex, d, a] for a in areas)
+    clock.lap('vars')
+
+    # --- Constraints ---
+
+    # if the exercise ex is on day d in area a then it should start after LB
+    model.addConstrs(z[ex, d, a]*LB[(ex, d, a)] <= x[ex, d, a] for (ex, d, a) in EDA)
+    # if not scheduled, force time to 0
+    model.addConstrs(x[ex, d, a] <= UB[(ex, d, a)]*z[ex, d, a] for (ex, d, a) in EDA)
+    # each exercise performed somewhere just once
+    model.addConstrs(gp.quicksum(z[ex, d, a] for d in D for a in EDA_ed.get((ex, d), [])) == 1 for ex in EX)
+    # only once per day or not at all
+    model.addConstrs(gp.quicksum(z[ex, d, a] for ex in EXsubset[e] for a in EDA_ed.get((ex, d), [])) <= 1 for d in D for e in E)
+    clock.lap('assignment')
+
+    def start(ix):
+        # start and indicator of one exercise over the EDA indices ix (areas of one (ex, d))
+        if len(ix) == 1:
+            return x[ix[0]], z[ix[0]]
+        if len(ix) == len(EDA_ed[ix[0][:2]]):
+            return xd[ix[0][:2]], zd[ix[0][:2]]
+        return gp.quicksum(x[idx] for idx in ix), gp.quicksum(z[idx] for idx in ix)
+
+    def add_disjunction(add, i):
+        (e1, e2, _, ix1, ix2), (m12, m21, _) = disjunctions[i], bigms[i]
+        x1, z1 = start(ix1)
+        x2, z2 = start(ix2)
+        if fixed.get((e1, e2)) != 1:
+            add(x1 + DX[e1] <= x2 + m12[0]*(1-z1) + m12[1]*(1-z2) + m12[2]*y[e1, e2])
+        if fixed.get((e1, e2)) != 0:
+            add(x2 + DX[e2] <= x1 + m21[0]*(1-z1) + m21[1]*(1-z2) + m21[2]*(1-y[e1, e2]))
+        return 2 - (fixed.get((e1, e2)) is not None)
+
+    # no overlap in exercises if on the same physical unit (area, or part of a subdivided hall)
+    # or if they conflict (Árekstur, any area on the same day)
+    n_dropped = 0
+    lazy_lookup = {}
+    for i, ((e1, e2, block, ix1, ix2), (m12, m21, order)) in enumerate(zip(disjunctions, bigms)):
+        if order == 'drop':
+            n_dropped += 1
+        elif lazy and block == 'unit':
+            # which disjunction separates e1 in area a1 from e2 in area a2 on day d
+            for (_, d, a1) in ix1:
+                for (_, _, a2) in ix2:
+                    lazy_lookup.setdefault((e1, e2, d, a1, a2), i)
+        else:
+            # same area for both, or different areas sharing a part of a subdivided hall
+            kind = block
+            if block == 'unit':
+                kind = 'overlap' if {a for (_, _, a) in ix1} & {a for (_, _, a) in ix2} else 'shared_hall'
+            rows[kind] += add_disjunction(model.addConstr, i)
+    clock.lap('disjunctions')
+
+    # Symmetry breaking: interchangeable exercises of an activity are on different days, take them in day order
+    n_symmetry = 0
+    if symmetry:
+        for exs in interchangeable_exercises(data, index):
+            day = [gp.quicksum(i*z[ex, d, a] for i, d in enumerate(D) for a in EDA_ed.get((ex, d), [])) for ex in exs]
+            for k in range(len(exs) - 1):
+                model.addConstr(day[k] + 1 <= day[k+1])
+                n_symmetry += 1
+
+    # Precedence constraints
+    for (e1, e2, d) in index['precedence_days']:
+        if bigm == 'tight':
+            le, ge = precedence_bigm(data, index, e1, e2, d)
+            m_le = m_ge = 0
+        else:
+            le = ge = m_le = m_ge = M
+        ex1 = [ex for ex in EXsubset[e1] if (ex, d) in xd]
+        ex2 = [ex for ex in EXsubset[e2] if (ex, d) in xd]
+        end1 = gp.quicksum(xd[ex, d] + DX[ex]*zd[ex, d] for ex in ex1)
+        start2 = gp.quicksum(xd[ex, d] for ex in ex2)
+        on1 = gp.quicksum(zd[ex, d] for ex in ex1)
+        on2 = gp.quicksum(zd[ex, d] for ex in ex2)
+        model.addConstr(end1 <= start2 + m_le*(1-on1) + le*(1-on2))
+        model.addConstr(end1 >= start2 - ge*(1-on1) - m_ge*(1-on2))
+        rows['precedence'] += 2
+    clock.lap('precedence')
+    # Objective: minimize sum of q + bias for early/late/area usage
+    model.setObjective(
+        100*gp.quicksum(q[e, i] for e in E for i in range(len(D))) +
+        (1/len(EX))*gp.quicksum(bias[a]*x[ex, d, a] for (ex, d, a) in EDA),
+        GRB.MINIMIZE
+    )
+    clock.lap('objective')
+    stats.update({'disjunctions': len(disjunctions), 'dropped': n_dropped, 'y_fixed': len(fixed), 'symmetry': n_symmetry,
+                  'y': len(y), **{'rows_' + block: n for block, n in rows.items()}})
+    vars = {'x': x, 'z': z, 'y': y, 'q': q, 'c': c, 'xd': xd, 'zd': zd, 'stats': stats}
+    if lazy:
+        vars['lazy'] = {'data': data, 'index': index, 'lookup': lazy_lookup, 'add': add_disjunction, 'added': set()}
+    return model, vars
+
+
+def add_lazy_disjunctions(model, vars):
+    """
+    MIPSOL callback part of lazy mode: sweep the new incumbent per (day, physical unit) and add the
+    disjunctions of the overlapping exercises as lazy constraints.
+    """
+    lazy, x, z = vars['lazy'], vars['x'], vars['z']
+    keys = list(z.keys())
+    z_val = model.cbGetSolution([z[idx] for idx in keys])
+    placed = [idx for idx, v in zip(keys, z_val) if v > 0.5]
+    x_val = model.cbGetSolution([x[idx] for idx in placed])
+    schedule = {ex: (d, a, start) for (ex, d, a), start in zip(placed, x_val)}
+    for kind, ex1, ex2, *rest in schedule_violations(lazy['data'], schedule, lazy['index']):
+        if kind != 'overlap':
+            continue
+        (d, a1, _), (_, a2, _) = schedule[ex1], schedule[ex2]
+        i = lazy['lookup'].get((ex1, ex2, d, a1, a2), lazy['lookup'].get((ex2, ex1, d, a2, a1)))
+        if i is not None and i not in lazy['added']:
+            lazy['added'].add(i)
+            lazy['add'](model.cbLazy, i)
+
+
+def solve(model, vars, time_limit=None, threads=None, log=True, progress=None):
+    """
+    Optimize a model from build_model. Returns the schedule {ex: (d, a, start)}, or None if no solution was found.
+    progress(objective, bound, elapsed, nodes) is called from the MIP callback, objective is None until there is an incumbent.
+    """
+    model.Params.OutputFlag = int(log)
+    if time_limit is not None:
+        model.Params.TimeLimit = time_limit
+    if threads is not None:
+        model.Params.Threads = threads
+    lazy = vars.get('lazy')
+    if lazy is not None:
+        model.Params.LazyConstraints = 1
+    if progress is None and lazy is None:
+        model.optimize()
+    else:
+        def callback(model, where):
+            if where == GRB.Callback.MIPSOL and lazy is not None:
+                add_lazy_disjunctions(model, vars)
+            if where == GRB.Callback.MIP and progress is not None:
+                objective = model.cbGet(GRB.Callback.MIP_OBJBST)
+                progress(objective if objective < GRB.INFINITY else None,
+                         model.cbGet(GRB.Callback.MIP_OBJBND), model.cbGet(GRB.Callback.RUNTIME),
+                         model.cbGet(GRB.Callback.MIP_NODCNT))
+        model.optimize(callback)
+        if lazy is not None:
+            vars['stats']['lazy_added'] = len(lazy['added'])
+    if model.SolCount == 0:
+        return None
+    x, z = vars['x'], vars['z']
+    return {ex: (d, a, x[ex, d, a].X) for (ex, d, a), var in z.items() if var.X > 0.5}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and solve the schedule model with Gurobi.")
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--time-limit', type=float, default=None, help="solver time limit in seconds")
+    parser.add_argument('--bigm', choices=['global', 'tight'], default='global',
+                        help="one global big-M or per-disjunction big-M from the time windows")
+    parser.add_argument('--aggregate', action='store_true',
+                        help="per (exercise, day) start and indicator variables in the conflict and precedence constraints")
+    parser.add_argument('--symmetry', action='store_true',
+                        help="order interchangeable exercises of the same activity by day")
+    parser.add_argument('--lazy', action='store_true',
+                        help="add the physical unit disjunctions lazily, only when an incumbent violates them")
+    parser.add_argument('--decompose', action='store_true',
+                        help="solve independent components of the interaction graph in a process pool")
+    parser.add_argument('--processes', type=int, default=None, help="worker processes for --decompose")
+    parser.add_argument('--warm-start', default=None,
+                        help="JSON file with the last solution, used as a MIP start and overwritten with the new one")
+    parser.add_argument('--keep', choices=['fix', 'hint'], default='fix',
+                        help="fix or only hint exercises the edit did not touch (with --warm-start)")
+    parser.add_argument('--greedy-start', action='store_true',
+                        help="use the greedy construction heuristic as a MIP start (unless a warm start is given)")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-read the database instead of using the compiled snapshot")
+    parser.add_argument('--telemetry', default=None,
+                        help="append a JSON line with model counters, phase times, peak memory and solver progress "
+                             "to this file (summarise with model/telemetry.py), not with --decompose")
+    args = parser.parse_args()
+
+    telemetry = Telemetry({k: v for k, v in args.__dict__.items() if k != 'telemetry'})
+    db = get_session(args.db)
+    with telemetry.phase('load'):
+        data = load_data(db) if args.no_cache else load_cached(db)
+    if args.decompose:
+        from model.decompose import solve_decomposed, print_components
+        schedule, status = solve_decomposed(data, 'gurobi', args.processes, args.time_limit,
+                                            options={'bigm': args.bigm, 'aggregate': args.aggregate,
+                                                     'symmetry': args.symmetry, 'lazy': args.lazy})
+        print_components(status)
+        if schedule is None:
+            print("No optimal solution found.")
+        else:
+            print_schedule(schedule, args.time_limit is None)
+            print(f"Saved as schedule run {save_run(db, data, schedule, 'decompose', args.time_limit is None)}")
+        return
+    with telemetry.phase('index'):
+        index = build_index(data)
+    size = model_size(data, index)
+    print_model_size(size)
+    with telemetry.phase('build'):
+        model, vars = build_model(data, index, bigm=args.bigm, aggregate=args.aggregate, symmetry=args.symmetry,
+                                  lazy=args.lazy)
+        model.update()
+    telemetry.update('size', size)
+    telemetry.update('build', vars['stats'])
+    print(f"disjunctions: {vars['stats']['disjunctions']}, dropped: {vars['stats']['dropped']}, "
+          f"y fixed: {vars['stats']['y_fixed']}")
+    solution = None
+    with telemetry.phase('start'):
+        if args.warm_start and os.path.exists(args.warm_start):
+            solution = load_solution(args.warm_start)
+            free = apply_start(model, vars, solution, data, index, args.keep)
+            print(f"warm start: re-optimising {len(free)} of {len(data['EX'])} exercises")
+        elif args.greedy_start:
+            greedy = greedy_schedule(data, index)
+            if args.symmetry:
+                greedy = order_interchangeable(data, greedy, interchangeable_exercises(data, index))
+            schedule_start(model, vars, greedy, data, index)
+            print(f"greedy start: placed {len(greedy)} of {len(data['EX'])} exercises")
+    with telemetry.phase('solve'):
+        schedule = solve(model, vars, args.time_limit, progress=telemetry if args.telemetry else None)
+    if schedule is None and solution is not None and args.keep == 'fix':
+        print("No solution with the untouched exercises fixed, re-solving with hints only.")
+        model, vars = build_model(data, index, bigm=args.bigm, aggregate=args.aggregate, symmetry=args.symmetry,
+                                  lazy=args.lazy)
+        apply_start(model, vars, solution, data, index, 'hint')
+        with telemetry.phase('resolve'):
+            schedule = solve(model, vars, args.time_limit, progress=telemetry if args.telemetry else None)
+    telemetry.update('build', vars['stats'])
+    telemetry.update('solver', gurobi_results(model))
+    if args.telemetry:
+        telemetry.write(args.telemetry)
+
+    # Output results
+    if schedule is None:
+        print("No optimal solution found.")
+    else:
+        print_schedule(schedule, model.status == GRB.OPTIMAL)
+        if args.lazy:
+            print(f"lazy disjunctions added: {vars['stats']['lazy_added']}")
+        if args.warm_start:
+            save_solution(args.warm_start, data, schedule, {p: v.X for p, v in vars['y'].items()})
+        print(f"Saved as schedule run {save_run(db, data, schedule, 'gurobi', model.status == GRB.OPTIMAL)}")
+
+
+if __name__ == '__main__':
+    main()
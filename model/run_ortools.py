@@ -0,0 +1,162 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import math
+from ortools.sat.python import cp_model
+from model.data import (DB_URL, get_session, load_data, build_index, interchangeable_exercises, order_interchangeable,
+                        schedule_objective, print_schedule)
+from model.greedy import greedy_schedule
+from model.warmstart import schedule_hint
+from model.results import save_run
+from model.snapshot import load_cached
+
+# CP-SAT needs integer coefficients, the area bias is scaled by this factor
+BIAS_SCALE = 100
+
+
+def build_model(data, index=None, symmetry=False):
+    """
+    Build the CP-SAT model for the inputs from load_data. Returns (model, vars).
+
+    Each (ex, d, a) in EDA is an optional interval of length DX[ex] starting at x[ex, d, a].
+    Intervals on the same physical unit (area, or third of A-sal) on the same day can not overlap.
+    symmetry=True orders interchangeable exercises of an activity by day, as in run_gurobi.build_model.
+    """
+    if index is None:
+        index = build_index(data)
+    E, D, EX, EXsubset, DX = data['E'], data['D'], data['EX'], data['EXsubset'], data['DX']
+    EDA, UB, LB, bias = data['EDA'], data['UB'], data['LB'], data['bias']
+    EDA_ed = index['EDA_ed']
+
+    # --- CP-SAT Model and Variables ---
+    model = cp_model.CpModel()
+    x = {}
+    z = {}
+    interval = {}
+    for (ex, d, a) in EDA:
+        lb, ub = int(LB[ex, d, a]), int(UB[ex, d, a])
+        # start is 0 when not scheduled, as in the Gurobi model
+        x[ex, d, a] = model.NewIntVarFromDomain(cp_model.Domain.FromIntervals([[0, 0], [lb, ub]]), f'x[{ex},{d},{a}]')
+        z[ex, d, a] = model.NewBoolVar(f'z[{ex},{d},{a}]')
+        interval[ex, d, a] = model.NewOptionalFixedSizeIntervalVar(
+            x[ex, d, a], math.ceil(DX[ex]), z[ex, d, a], f'i[{ex},{d},{a}]')
+        model.Add(x[ex, d, a] >= lb).OnlyEnforceIf(z[ex, d, a])
+        model.Add(x[ex, d, a] == 0).OnlyEnforceIf(z[ex, d, a].Not())
+
+    # --- Constraints ---
+
+    # each exercise performed somewhere just once
+    for ex in EX:
+        model.AddExactlyOne(z[ex, d, a] for d in D for a in EDA_ed.get((ex, d), []))
+    # only once per day or not at all
+    for e in E:
+        for d in D:
+            day = [z[ex, d, a] for ex in EXsubset[e] for a in EDA_ed.get((ex, d), [])]
+            if len(day) > 1:
+                model.AddAtMostOne(day)
+    # no overlap on a physical unit: same area, or areas of the same hall (A-sal thirds)
+    for (d, u), exa in index['EDA_du'].items():
+        if len(exa) > 1:
+            model.AddNoOverlap(interval[ex, d, a] for (ex, a) in exa)
+    # Árekstur (conflict): not at the same time on the same day, in any area
+    for (ex1, ex2, d) in {tuple(sorted(p[:2])) + (p[2],) for p in index['conflict_pairs']}:
+        model.AddNoOverlap(
+            [interval[ex1, d, a] for a in EDA_ed[ex1, d]] + [interval[ex2, d, a] for a in EDA_ed[ex2, d]]
+        )
+    # Precedence: if both on day d, e1 ends when e2 starts
+    for (e1, e2, d) in index['precedence_days']:
+        on_day = []
+        for e in (e1, e2):
+            w = model.NewBoolVar(f'w[{e},{d}]')
+            model.Add(sum(z[ex, d, a] for ex in EXsubset[e] for a in EDA_ed.get((ex, d), [])) == w)
+            on_day.append(w)
+        model.Add(
+            sum(x[ex, d, a] + math.ceil(DX[ex])*z[ex, d, a] for ex in EXsubset[e1] for a in EDA_ed.get((ex, d), [])) ==
+            sum(x[ex, d, a] for ex in EXsubset[e2] for a in EDA_ed.get((ex, d), []))
+        ).OnlyEnforceIf(on_day)
+
+    # Symmetry breaking: interchangeable exercises of an activity in day order
+    if symmetry:
+        for exs in interchangeable_exercises(data, index):
+            day = [sum(i*z[ex, d, a] for i, d in enumerate(D) for a in EDA_ed.get((ex, d), [])) for ex in exs]
+            for k in range(len(exs) - 1):
+                model.Add(day[k] < day[k+1])
+
+    # Objective: bias for early/late/area usage
+    model.Minimize(sum(round(BIAS_SCALE*bias[a])*x[ex, d, a] for (ex, d, a) in EDA))
+    # objective / scale is on the schedule_objective (Gurobi) scale
+    return model, {'x': x, 'z': z, 'interval': interval, 'scale': BIAS_SCALE*max(len(EX), 1)}
+
+
+class ProgressCallback(cp_model.CpSolverSolutionCallback):
+    """
+    Passes each new incumbent to progress(objective, bound, elapsed, nodes), with the objective and
+    bound divided by scale so they compare with schedule_objective.
+    """
+    def __init__(self, progress, scale=1):
+        super().__init__()
+        self.progress = progress
+        self.scale = scale
+
+    def on_solution_callback(self):
+        self.progress(self.ObjectiveValue()/self.scale, self.BestObjectiveBound()/self.scale, self.WallTime(),
+                      self.NumBranches())
+
+
+def solve(model, vars, time_limit=None, num_workers=8, log=True, progress=None):
+    """
+    Solve a model from build_model with num_workers parallel search workers.
+    Returns the schedule {ex: (d, a, start)}, or None if no solution was found.
+    progress(objective, bound, elapsed, nodes) is called for each new incumbent, on the schedule_objective
+    scale, nodes is the number of branches.
+    """
+    solver = cp_model.CpSolver()
+    solver.parameters.num_workers = num_workers
+    solver.parameters.log_search_progress = log
+    if time_limit is not None:
+        solver.parameters.max_time_in_seconds = time_limit
+    status = solver.Solve(model, ProgressCallback(progress, vars.get('scale', 1)) if progress is not None else None)
+    vars['status'] = solver.StatusName(status)
+    if status not in (cp_model.OPTIMAL, cp_model.FEASIBLE):
+        return None
+    x, z = vars['x'], vars['z']
+    return {ex: (d, a, float(solver.Value(x[ex, d, a]))) for (ex, d, a), var in z.items() if solver.BooleanValue(var)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build and solve the schedule model with OR-Tools CP-SAT.")
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--time-limit', type=float, default=None, help="solver time limit in seconds")
+    parser.add_argument('--workers', type=int, default=8, help="number of parallel search workers")
+    parser.add_argument('--greedy-hint', action='store_true', help="hint the greedy construction heuristic's schedule")
+    parser.add_argument('--symmetry', action='store_true',
+                        help="order interchangeable exercises of the same activity by day")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-read the database instead of using the compiled snapshot")
+    args = parser.parse_args()
+
+    db = get_session(args.db)
+    data = load_data(db) if args.no_cache else load_cached(db)
+    index = build_index(data)
+    model, vars = build_model(data, index, symmetry=args.symmetry)
+    if args.greedy_hint:
+        greedy = greedy_schedule(data, index)
+        if args.symmetry:
+            greedy = order_interchangeable(data, greedy, interchangeable_exercises(data, index))
+        schedule_hint(model, vars, greedy, data, index)
+        print(f"greedy hint: placed {len(greedy)} of {len(data['EX'])} exercises")
+    schedule = solve(model, vars, args.time_limit, args.workers)
+
+    # Output results
+    if schedule is None:
+        print("No solution found.")
+    else:
+        print_schedule(schedule, vars['status'] == 'OPTIMAL')
+        print(f"Objective: {schedule_objective(data, schedule):.4f}")
+        print(f"Saved as schedule run {save_run(db, data, schedule, 'ortools', vars['status'] == 'OPTIMAL')}")
+
+
+if __name__ == '__main__':
+    main()
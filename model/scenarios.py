@@ -0,0 +1,215 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import json
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import gurobipy as gp
+import pandas as pd
+from model.data import DB_URL, get_session, load_data, build_index, exercise_name, schedule_objective
+from model.snapshot import load_cached
+from model.run_gurobi import build_model, solve
+
+CHANGE_COLUMNS = ['scenario', 'exercise', 'base_day', 'base_area', 'base_start', 'day', 'area', 'start']
+
+
+def restrictions(data, index, scenario):
+    """
+    The bound changes of a scenario on the base model: the EDA indices it closes (z = 0) and the
+    [earliest, latest] start window it imposes on others.
+
+    "close": [{"area": a, "day": d}] closes a on day d (every day if no day is given) and every area
+    sharing a physical unit with it, e.g. 2/3 A-sal when 1/3 A-sal-2 is closed.
+    "window": [{"activity": e, "day": d, "earliest": t, "latest": t}] tightens LB/UB of the exercises
+    of e (on day d, or every day). An empty window closes them.
+    """
+    units = index['area_units']
+    closed = set()
+    for c in scenario.get('close', []):
+        parts = set(units.get(c['area'], [c['area']]))
+        for (ex, d, a) in data['EDA']:
+            if c.get('day', d) == d and parts & set(units.get(a, [a])):
+                closed.add((ex, d, a))
+    windows = {}
+    for w in scenario.get('window', []):
+        for ex in data['EXsubset'][w['activity']]:
+            for d in data['D']:
+                if w.get('day', d) != d:
+                    continue
+                for a in index['EDA_ed'].get((ex, d), []):
+                    lo = max(data['LB'][ex, d, a], w.get('earliest', 0))
+                    hi = min(data['UB'][ex, d, a], w.get('latest', 24*60))
+                    if lo > hi:
+                        closed.add((ex, d, a))
+                    else:
+                        windows[ex, d, a] = (lo, hi)
+    return closed, windows
+
+
+def add_sessions(data, scenario):
+    """
+    The inputs with the extra exercises of a scenario, "extra_session": [{"activity": e, "length": minutes}].
+    The new exercise can use the days, areas and windows of the activity's first weekday exercise (its
+    first weekend exercise if it has none). An activity without exercises gets one on its weekday
+    sessions (weekend sessions if it has none) and must give the length.
+    These change the structure of the model, so such a scenario is built on its own.
+    """
+    data = {**data, 'EXsubset': dict(data['EXsubset']), 'DX': dict(data['DX']),
+            'EDA': list(data['EDA']), 'LB': dict(data['LB']), 'UB': dict(data['UB'])}
+    for s in scenario.get('extra_session', []):
+        e = s['activity']
+        exs = data['EXsubset'][e]
+        weekday = [exercise_name(e, i) for i in range(len(exs)) if exercise_name(e, i) in exs]
+        weekend = [exercise_name(e, i, True) for i in range(len(exs)) if exercise_name(e, i, True) in exs]
+        if exs:
+            same = weekday or weekend
+            ex = exercise_name(e, len(same), weekend=not weekday)
+            template = same[0]
+            data['DX'][ex] = s.get('length', data['DX'][template])
+            cells = [(d, a, data['LB'][ex0, d, a], data['UB'][ex0, d, a]) for (ex0, d, a) in data['EDA'] if ex0 == template]
+        else:
+            if 'length' not in s:
+                raise ValueError(f"extra_session for {e} needs a length, the activity has no exercises")
+            days = data['class_schedule'].get(e, {})
+            weekend = not any(d not in data['Dw'] for d in days)
+            ex = exercise_name(e, 0, weekend)
+            data['DX'][ex] = s['length']
+            cells = [(d, a, float(lb or 0), float(24*60 if ub is None else ub))
+                     for d, (lb, ub) in days.items() if (d in data['Dw']) == weekend
+                     for a in data['e_a'].get(e, [])]
+        data['EXsubset'][e] = exs + [ex]
+        for (d, a, lb, ub) in cells:
+            data['EDA'].append((ex, d, a))
+            data['LB'][ex, d, a] = lb
+            data['UB'][ex, d, a] = ub
+    data['EX'] = [ex for e in data['E'] for ex in data['EXsubset'][e]]
+    return data
+
+
+def apply_restrictions(model, vars, closed, windows):
+    """
+    Closed indices get z fixed to 0. A window lowers the bound of x and adds the row x >= earliest*z.
+    """
+    x, z = vars['x'], vars['z']
+    for idx in closed:
+        z[idx].ub = 0
+        x[idx].ub = 0
+    for idx, (lo, hi) in windows.items():
+        x[idx].ub = min(x[idx].ub, hi)
+        model.addConstr(x[idx] >= lo*z[idx])
+
+
+def var_positions(vars):
+    """
+    Column positions of x and z in their (updated) model, read before any copy is solved.
+    """
+    return {key: {idx: v.index for idx, v in vars[key].items()} for key in ('x', 'z')}
+
+
+def copy_vars(positions, copy):
+    """
+    x and z of a model copy, by column position (model.copy keeps the variable order).
+    """
+    columns = copy.getVars()
+    return {key: {idx: columns[i] for idx, i in positions[key].items()} for key in ('x', 'z')}
+
+
+def run_scenarios(data, scenarios, time_limit=60, threads=1, workers=4, bigm='global'):
+    """
+    Solve the base model and every scenario. The base model is built once; each scenario solves its own
+    copy of it with the scenario's bound changes and rows, in parallel threads with one Gurobi
+    environment each. Scenarios with extra sessions are built on their own.
+    Returns (comparison DataFrame, changes DataFrame with CHANGE_COLUMNS).
+    """
+    index = build_index(data)
+    base, base_vars = build_model(data, index, bigm)
+    base.update()
+    # the models are shared by the threads, so their column positions are read here, once per model
+    base_positions = var_positions(base_vars)
+    jobs = [('base', data, base, base_positions, set(), {})]
+    for scenario in scenarios:
+        if scenario.get('extra_session'):
+            sdata = add_sessions(data, scenario)
+            sindex = build_index(sdata)
+            model, vars = build_model(sdata, sindex, bigm)
+            model.update()
+            positions = var_positions(vars)
+        else:
+            sdata, sindex, model, positions = data, index, base, base_positions
+        closed, windows = restrictions(sdata, sindex, scenario)
+        jobs.append((scenario['name'], sdata, model, positions, closed, windows))
+
+    lock = threading.Lock()
+
+    def run(job):
+        name, sdata, model, positions, closed, windows = job
+        # Gurobi environments are not thread safe, each scenario gets its own
+        with lock:
+            env = gp.Env(empty=True)
+            env.setParam('OutputFlag', 0)
+            env.start()
+            copy = model.copy(env)
+        try:
+            cvars = copy_vars(positions, copy)
+            apply_restrictions(copy, cvars, closed, windows)
+            schedule = solve(copy, cvars, time_limit, threads, log=False)
+            gap = copy.MIPGap if copy.SolCount else None
+        finally:
+            copy.dispose()
+            env.dispose()
+        return name, sdata, schedule, gap
+
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(run, jobs))
+
+    base_schedule = results[0][2] or {}
+    # deltas use the base len(EX) for every scenario, extra sessions change it
+    base_objective = schedule_objective(data, base_schedule)
+    rows, changes = [], []
+    for name, sdata, schedule, gap in results:
+        if schedule is None:
+            rows.append({'scenario': name, 'status': 'no_solution'})
+            continue
+        objective = schedule_objective(sdata, schedule)
+        moved = 0
+        for ex in sorted(set(schedule) | set(base_schedule)):
+            old, new = base_schedule.get(ex, (None,)*3), schedule.get(ex, (None,)*3)
+            if old[:2] != new[:2] or old[2] is None or abs(old[2] - new[2]) > 1e-6:
+                moved += 1
+                changes.append(dict(zip(CHANGE_COLUMNS, (name, ex) + tuple(old) + tuple(new))))
+        rows.append({
+            'scenario': name, 'status': 'solved', 'objective': objective,
+            'delta': schedule_objective(data, schedule) - base_objective if results[0][2] else None,
+            'gap': gap, 'unplaced': len(sdata['EX']) - len(schedule), 'changed': moved,
+        })
+    return pd.DataFrame(rows), pd.DataFrame(changes, columns=CHANGE_COLUMNS)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Solve what-if scenarios against copies of one compiled Gurobi model.")
+    parser.add_argument('scenarios', help="JSON file with a list of scenarios, e.g. "
+                                          '[{"name": "A-sal-2 closed", "close": [{"area": "1/3 A-sal-2", "day": "fim"}]}]')
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-read the database instead of using the compiled snapshot")
+    parser.add_argument('--time-limit', type=float, default=60, help="solver time limit in seconds per scenario")
+    parser.add_argument('--threads', type=int, default=1, help="Gurobi threads per scenario")
+    parser.add_argument('--workers', type=int, default=4, help="scenarios solved at the same time")
+    parser.add_argument('--bigm', choices=['global', 'tight'], default='global')
+    parser.add_argument('--changes', default=None, help="write the changed assignments of every scenario to this CSV file")
+    args = parser.parse_args()
+
+    with open(args.scenarios, encoding='utf-8') as f:
+        scenarios = json.load(f)
+    db = get_session(args.db)
+    data = load_data(db) if args.no_cache else load_cached(db)
+    table, changes = run_scenarios(data, scenarios, args.time_limit, args.threads, args.workers, args.bigm)
+    print(table.to_string(index=False))
+    if args.changes:
+        changes.to_csv(args.changes, index=False)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import datetime
+import hashlib
+import json
+from model.data import DB_URL, get_session, load_data, build_index, subset_data
+from model.snapshot import load_cached, CACHE_DIR
+from model.warmstart import solution_inputs, save_solution, load_solution
+from model.results import save_run
+
+
+def week_start(day):
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def active_activities(data, monday):
+    """
+    Activities whose period overlaps the week starting on monday. An open period end (or start) is unbounded.
+    """
+    sunday = monday + datetime.timedelta(days=6)
+    return frozenset(
+        e for e in data['E']
+        if (data['period'].get(e, (None, None))[0] or monday) <= sunday
+        and (data['period'].get(e, (None, None))[1] or sunday) >= monday
+    )
+
+
+def season_segments(data, first_day, last_day):
+    """
+    Split the season into runs of consecutive weeks with the same active activities.
+    Returns a list of (first monday, last monday, active activities).
+    """
+    segments = []
+    monday = week_start(first_day)
+    while monday <= last_day:
+        active = active_activities(data, monday)
+        if segments and segments[-1][2] == active:
+            segments[-1] = (segments[-1][0], monday, active)
+        else:
+            segments.append((monday, monday, active))
+        monday += datetime.timedelta(days=7)
+    return segments
+
+
+def signature(data):
+    """
+    Hash of the inputs of a weekly model, the key its solved template is cached under. Besides the
+    solution inputs this covers the hall composition and the area biases, either can change the schedule.
+    """
+    inputs = {**solution_inputs(data), 'area_parts': data['area_parts'], 'bias': data['bias']}
+    return hashlib.sha256(json.dumps(inputs, sort_keys=True, ensure_ascii=False, default=str).encode()).hexdigest()[:32]
+
+
+def solve_week(data, backend='gurobi', time_limit=None, previous=None, keep='fix'):
+    """
+    Solve one weekly template, warm-started from the template of a neighbouring segment if given.
+    Returns (schedule, y) or (None, None).
+    """
+    if backend == 'gurobi':
+        from model.run_gurobi import build_model, solve
+        from model.warmstart import apply_start as warm_start
+    else:
+        from model.run_ortools import build_model, solve
+        from model.warmstart import apply_hint as warm_start
+    if not data['EX']:
+        return {}, {}
+    index = build_index(data)
+    model, vars = build_model(data, index)
+    if previous is not None:
+        warm_start(model, vars, previous, data, index, keep)
+    schedule = solve(model, vars, time_limit, log=False)
+    if schedule is None and previous is not None and keep == 'fix':
+        model, vars = build_model(data, index)
+        warm_start(model, vars, previous, data, index, 'hint')
+        schedule = solve(model, vars, time_limit, log=False)
+    if schedule is None:
+        return None, None
+    y = {p: v.X for p, v in vars['y'].items()} if backend == 'gurobi' else None
+    return schedule, y
+
+
+def plan_season(data, first_day, last_day, backend='gurobi', time_limit=None, keep='fix', cache_dir=CACHE_DIR):
+    """
+    Weekly templates for every segment of the season. Each distinct template is solved once, cached on
+    disk by its signature and warm-started from the template of the segment before it.
+    Returns a list of {'first_week', 'last_week', 'activities', 'signature', 'data', 'schedule', 'cached'},
+    where data is the segment's inputs.
+    """
+    template_dir = os.path.join(cache_dir, 'season')
+    os.makedirs(template_dir, exist_ok=True)
+    plan = []
+    templates = {}
+    previous = None
+    for first, last, active in season_segments(data, first_day, last_day):
+        week = subset_data(data, active)
+        key = signature(week)
+        path = os.path.join(template_dir, key + '.json')
+        cached = key in templates or os.path.exists(path)
+        if key not in templates:
+            if os.path.exists(path):
+                templates[key] = load_solution(path)
+            else:
+                schedule, y = solve_week(week, backend, time_limit, previous, keep)
+                if schedule is None:
+                    raise RuntimeError(f"No schedule found for the weeks {first} to {last}")
+                save_solution(path, week, schedule, y)
+                templates[key] = load_solution(path)
+        previous = templates[key]
+        plan.append({'first_week': first, 'last_week': last, 'activities': len(active), 'signature': key,
+                     'data': week, 'schedule': templates[key]['schedule'], 'cached': cached})
+    return plan
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Plan a season of weekly timetables from the activity periods.")
+    parser.add_argument('first_day', type=datetime.date.fromisoformat, help="first day of the season, YYYY-MM-DD")
+    parser.add_argument('last_day', type=datetime.date.fromisoformat, help="last day of the season, YYYY-MM-DD")
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--no-cache', action='store_true',
+                        help="always re-read the database instead of using the compiled snapshot")
+    parser.add_argument('--backend', choices=['gurobi', 'ortools'], default='gurobi')
+    parser.add_argument('--time-limit', type=float, default=None, help="solver time limit in seconds per template")
+    parser.add_argument('--keep', choices=['fix', 'hint'], default='fix',
+                        help="fix or only hint the exercises a template shares with the one before it")
+    args = parser.parse_args()
+
+    db = get_session(args.db)
+    data = load_data(db) if args.no_cache else load_cached(db)
+    plan = plan_season(data, args.first_day, args.last_day, args.backend, args.time_limit, args.keep)
+    runs = {}
+    for segment in plan:
+        key = segment['signature']
+        if key not in runs:
+            runs[key] = save_run(db, segment['data'], segment['schedule'], 'season')
+        weeks = (segment['last_week'] - segment['first_week']).days//7 + 1
+        print(f"{segment['first_week']} to {segment['last_week'] + datetime.timedelta(days=6)}: {weeks:>2} weeks, "
+              f"{segment['activities']:>4} activities, template {key[:8]} (run {runs[key]}"
+              f"{', cached' if segment['cached'] else ''})")
+    print(f"{len(plan)} segments, {len(runs)} distinct templates")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,133 @@
+import datetime
+import hashlib
+import os
+import tempfile
+import numpy as np
+from sqlalchemy import text
+from model.data import D, Dw, ensure_area_parts, load_data
+
+CACHE_DIR = '.nsn_cache'
+# Bump when load_data or the snapshot layout changes, so old snapshots are not reused
+SNAPSHOT_VERSION = 4
+
+# The table contents the model inputs depend on, in a stable order
+HASH_QUERIES = [
+    ("SELECT activity_id, club_id, groups_count, length_str, length_weekend_str, period_start, period_end "
+     "FROM activities ORDER BY activity_id"),
+    "SELECT area_id FROM areas ORDER BY area_id",
+    "SELECT activity_id, day_of_week, area_id, min_start, max_end FROM sessions ORDER BY activity_id, day_of_week, area_id, session_id",
+    "SELECT activity_id, conflict_activity_id FROM conflicts ORDER BY id",
+    "SELECT activity_id, must_be_before_activity_id FROM prerequisites ORDER BY id",
+    "SELECT area_id, part_area_id FROM area_parts ORDER BY area_id, part_area_id",
+]
+
+
+def content_hash(db):
+    """
+    Hash of the table contents the model inputs are compiled from.
+    """
+    ensure_area_parts(db)
+    h = hashlib.sha256(f'{SNAPSHOT_VERSION}|'.encode())
+    for query in HASH_QUERIES:
+        for row in db.execute(text(query)):
+            h.update(repr(tuple(row)).encode())
+        h.update(b'|')
+    return h.hexdigest()[:32]
+
+
+def compile_data(data):
+    """
+    Compact, array-backed form of the inputs from load_data: strings are stored once and
+    everything else refers to them by integer index.
+    """
+    E, EX, A = data['E'], data['EX'], data['A']
+    e_idx = {e: i for i, e in enumerate(E)}
+    ex_idx = {ex: i for i, ex in enumerate(EX)}
+    d_idx = {d: i for i, d in enumerate(D)}
+    names = sorted(set(A) | {a for (ex, d, a) in data['EDA']} | {a for v in data['e_a'].values() for a in v})
+    a_idx = {a: i for i, a in enumerate(names)}
+    schedule = [(e, d, w) for e, days in data['class_schedule'].items() for d, w in days.items()]
+    parts = [(a1, a2) for a1, a2s in data['area_parts'].items() for a2 in a2s]
+    return {
+        'E': np.array(E, dtype=str),
+        'EX': np.array(EX, dtype=str),
+        'areas': np.array(names, dtype=str),
+        'A': np.array([a_idx[a] for a in A], dtype=np.int32),
+        'ex_activity': np.array([e_idx[e] for e in E for ex in data['EXsubset'][e]], dtype=np.int32),
+        'DX': np.array([data['DX'][ex] for ex in EX], dtype=np.float64),
+        'eda': np.array([(ex_idx[ex], d_idx[d], a_idx[a]) for (ex, d, a) in data['EDA']], dtype=np.int32).reshape(-1, 3),
+        'LB': np.array([data['LB'][idx] for idx in data['EDA']], dtype=np.float64),
+        'UB': np.array([data['UB'][idx] for idx in data['EDA']], dtype=np.float64),
+        'cx': np.array([(e_idx[e1], e_idx[e2]) for e1, e2s in data['CX'].items() for e2 in e2s], dtype=np.int32).reshape(-1, 2),
+        'undan': np.array([(e_idx[e1], e_idx[e2]) for e1, e2 in data['undan_eftir'].items()], dtype=np.int32).reshape(-1, 2),
+        'e_a': np.array([(e_idx[e], a_idx[a]) for e, v in data['e_a'].items() for a in sorted(v)], dtype=np.int32).reshape(-1, 2),
+        'cs_day': np.array([(e_idx[e], d_idx[d]) for e, d, w in schedule], dtype=np.int32).reshape(-1, 2),
+        'cs_window': np.array([[np.nan if t is None else t for t in w] for e, d, w in schedule], dtype=np.float64).reshape(-1, 2),
+        'area_parts': np.array(parts, dtype=str).reshape(-1, 2),
+        'bias': np.array([data['bias'].get(a, 1.0) for a in names], dtype=np.float64),
+        'club': np.array([data['club'].get(e) or '' for e in E], dtype=str),
+        'period': np.array([[t.isoformat() if t else '' for t in data['period'].get(e, (None, None))] for e in E],
+                           dtype=str).reshape(-1, 2),
+    }
+
+
+def expand(arrays):
+    """
+    The inputs in the form load_data returns them, from compile_data arrays.
+    """
+    E = arrays['E'].tolist()
+    EX = arrays['EX'].tolist()
+    names = arrays['areas'].tolist()
+    ex_activity = arrays['ex_activity'].tolist()
+    EXsubset = {e: [] for e in E}
+    for ex, i in zip(EX, ex_activity):
+        EXsubset[E[i]].append(ex)
+    EDA = [(EX[i], D[d], names[a]) for i, d, a in arrays['eda'].tolist()]
+    CX = {}
+    for i, j in arrays['cx'].tolist():
+        CX.setdefault(E[i], []).append(E[j])
+    e_a = {}
+    for i, a in arrays['e_a'].tolist():
+        e_a.setdefault(E[i], set()).add(names[a])
+    class_schedule = {}
+    for (i, d), w in zip(arrays['cs_day'].tolist(), arrays['cs_window'].tolist()):
+        class_schedule.setdefault(E[i], {})[D[d]] = tuple(None if t != t else int(t) for t in w)
+    area_parts = {}
+    for a1, a2 in arrays['area_parts'].tolist():
+        area_parts.setdefault(a1, []).append(a2)
+    return {
+        'E': E, 'D': list(D), 'Dw': list(Dw), 'A': [names[a] for a in arrays['A'].tolist()],
+        'e_a': e_a, 'class_schedule': class_schedule,
+        'EXsubset': EXsubset, 'EX': EX, 'DX': dict(zip(EX, arrays['DX'].tolist())),
+        'EDA': EDA, 'UB': dict(zip(EDA, arrays['UB'].tolist())), 'LB': dict(zip(EDA, arrays['LB'].tolist())),
+        'CX': CX,
+        'undan_eftir': {E[i]: E[j] for i, j in arrays['undan'].tolist()},
+        'area_parts': area_parts,
+        'bias': dict(zip(names, arrays['bias'].tolist())),
+        'club': {e: c or None for e, c in zip(E, arrays['club'].tolist())},
+        'period': {e: tuple(datetime.date.fromisoformat(t) if t else None for t in p)
+                   for e, p in zip(E, arrays['period'].tolist())},
+    }
+
+
+def load_cached(db, cache_dir=CACHE_DIR):
+    """
+    load_data through an on-disk snapshot keyed by the hash of the table contents.
+    Unchanged data is read from the snapshot instead of being queried and parsed again.
+    """
+    path = os.path.join(cache_dir, content_hash(db) + '.npz')
+    if os.path.exists(path):
+        with np.load(path, allow_pickle=False) as arrays:
+            return expand(arrays)
+    data = load_data(db)
+    os.makedirs(cache_dir, exist_ok=True)
+    # a temporary file of its own, so concurrent writers never replace with a half-written one
+    fd, tmp = tempfile.mkstemp(dir=cache_dir, suffix='.npz')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            np.savez(f, **compile_data(data))
+        os.replace(tmp, path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return data
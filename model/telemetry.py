@@ -0,0 +1,173 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import datetime
+import json
+import time
+
+# Seconds between progress samples, on top of one per new incumbent
+SAMPLE_INTERVAL = 1.0
+
+
+def peak_memory_mb():
+    """
+    Process peak memory in MB, or None where the resource module is missing (Windows).
+    """
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in kB on Linux and covers memory allocated by the solver as well
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 2)
+
+
+class PhaseTimer:
+    """
+    Times a phase and records the process peak memory (MB, None if unavailable) at the end of it.
+    """
+    def __init__(self, record, name):
+        self.record = record
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.record[self.name + '_s'] = round(time.perf_counter() - self.start, 4)
+        self.record[self.name + '_peak_mb'] = peak_memory_mb()
+        return False
+
+
+class PhaseClock:
+    """
+    Times consecutive phases: lap(name) records the time since the previous lap (or since the clock
+    was created) and the process peak memory (MB, None if unavailable) as prefix + name + '_s' and '_peak_mb'.
+    """
+    def __init__(self, record, prefix=''):
+        self.record = record
+        self.prefix = prefix
+        self.last = time.perf_counter()
+
+    def lap(self, name):
+        now = time.perf_counter()
+        self.record[self.prefix + name + '_s'] = round(now - self.last, 4)
+        self.record[self.prefix + name + '_peak_mb'] = peak_memory_mb()
+        self.last = now
+
+
+class Telemetry:
+    """
+    One JSON-lines record per run, with one section per kind of value so names can not collide:
+    'options' (the CLI arguments), 'phases' (time and peak memory), and whatever update() adds,
+    e.g. 'size', 'build' and 'solver'. Also usable as progress(objective, bound, elapsed, nodes) for solve().
+    """
+    def __init__(self, options=None):
+        self.record = {'created': datetime.datetime.now().isoformat(timespec='seconds'),
+                       'options': dict(options or {}), 'phases': {}}
+        self.samples = []
+        self.objective = None
+        self.sampled = None
+
+    def phase(self, name):
+        return PhaseTimer(self.record['phases'], name)
+
+    def update(self, section, values):
+        self.record.setdefault(section, {}).update(values)
+
+    def __call__(self, objective, bound, elapsed, nodes=None):
+        if objective == self.objective and self.sampled is not None and elapsed - self.sampled < SAMPLE_INTERVAL:
+            return
+        self.objective = objective
+        self.sampled = elapsed
+        gap = round(abs(objective - bound)/max(abs(objective), 1e-10), 6) if objective is not None and bound is not None else None
+        self.samples.append({'elapsed': round(elapsed, 3), 'objective': objective, 'bound': bound,
+                             'gap': gap, 'nodes': nodes})
+
+    def write(self, path):
+        with open(path, 'a') as f:
+            f.write(json.dumps({**self.record, 'progress': self.samples}, default=str) + '\n')
+
+
+def gurobi_results(model):
+    """
+    Final solver counters of an optimized Gurobi model.
+    """
+    results = {'rows': model.NumConstrs, 'columns': model.NumVars, 'nonzeros': model.NumNZs,
+               'status': model.Status, 'runtime': round(model.Runtime, 3), 'solutions': model.SolCount}
+    if model.IsMIP:
+        results['nodes'] = model.NodeCount
+        results['bound'] = model.ObjBound
+    if model.SolCount:
+        results['objective'] = model.ObjVal
+        results['gap'] = model.MIPGap
+    return results
+
+
+def read_runs(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def scalars(run, prefix=''):
+    """
+    The scalar values of a run, with sections flattened to 'section.name'.
+    """
+    values = {}
+    for k, v in run.items():
+        if isinstance(v, dict):
+            values.update(scalars(v, prefix + k + '.'))
+        elif not isinstance(v, list):
+            values[prefix + k] = v
+    return values
+
+
+def summarise(run):
+    lines = [f"{k:>32}  {v}" for k, v in scalars(run).items()]
+    samples = run.get('progress', [])
+    if samples:
+        first = next((s for s in samples if s['objective'] is not None), None)
+        lines.append(f"{'progress samples':>32}  {len(samples)}")
+        if first is not None:
+            lines.append(f"{'first incumbent':>32}  {first['objective']} at {first['elapsed']}s")
+        last = samples[-1]
+        lines.append(f"{'last sample':>32}  objective {last['objective']}, bound {last['bound']}, "
+                     f"gap {last['gap']}, nodes {last['nodes']} at {last['elapsed']}s")
+    return '\n'.join(lines)
+
+
+def diff(run1, run2):
+    """
+    Side by side values of two runs, with the change of numeric ones.
+    """
+    a, b = scalars(run1), scalars(run2)
+    lines = []
+    for k in list(dict.fromkeys(list(a) + list(b))):
+        v1, v2 = a.get(k), b.get(k)
+        change = ''
+        if isinstance(v1, (int, float)) and isinstance(v2, (int, float)) and not isinstance(v1, bool):
+            change = f"{v2 - v1:+.4g}" + (f" ({(v2 - v1)/abs(v1):+.1%})" if v1 else '')
+        elif v1 == v2:
+            continue
+        lines.append(f"{k:>32}  {str(v1):>14}  {str(v2):>14}  {change}")
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarise or compare telemetry records from run_gurobi.py --telemetry.")
+    parser.add_argument('path', help="JSON-lines telemetry file")
+    parser.add_argument('runs', type=int, nargs='*', default=[-1],
+                        help="one run to summarise or two to compare, by position in the file (negative from the end)")
+    args = parser.parse_args()
+
+    runs = read_runs(args.path)
+    if len(args.runs) == 1:
+        print(summarise(runs[args.runs[0]]))
+    else:
+        print(diff(runs[args.runs[0]], runs[args.runs[1]]))
+
+
+if __name__ == '__main__':
+    main()
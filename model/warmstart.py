@@ -0,0 +1,187 @@
+import json
+from model.data import build_index
+
+
+def solution_inputs(data):
+    """
+    The inputs a solution depends on, used to find what changed between two runs.
+    """
+    return {
+        'window': [[ex, d, a, data['LB'][ex, d, a], data['UB'][ex, d, a]] for (ex, d, a) in data['EDA']],
+        'DX': data['DX'],
+        'CX': data['CX'],
+        'undan_eftir': data['undan_eftir'],
+    }
+
+
+def save_solution(path, data, schedule, y=None):
+    """
+    Persist a schedule {ex: (d, a, start)} as x, z (and y) values, with the inputs it was solved for.
+    """
+    solution = {
+        'x': [[ex, d, a, start] for ex, (d, a, start) in schedule.items()],
+        'z': [[ex, d, a, 1] for ex, (d, a, start) in schedule.items()],
+        'y': [[e1, e2, round(v)] for (e1, e2), v in (y or {}).items()],
+        'inputs': solution_inputs(data),
+    }
+    with open(path, 'w', encoding='utf-8') as f:
+        json.dump(solution, f, ensure_ascii=False)
+
+
+def load_solution(path):
+    with open(path, encoding='utf-8') as f:
+        solution = json.load(f)
+    solution['schedule'] = {ex: (d, a, start) for ex, d, a, start in solution['x']}
+    solution['y'] = {(e1, e2): v for e1, e2, v in solution['y']}
+    return solution
+
+
+def changed_exercises(solution, data):
+    """
+    Exercises whose allowed days/areas, windows or length changed since the solution, that are new,
+    or whose activity has a changed Conflict or Prerequisite row.
+    """
+    old = solution['inputs']
+    new = solution_inputs(data)
+    old_window = {(ex, d, a): (lb, ub) for ex, d, a, lb, ub in old['window']}
+    new_window = {(ex, d, a): (lb, ub) for ex, d, a, lb, ub in new['window']}
+    changed = set()
+    for idx in set(old_window) | set(new_window):
+        if old_window.get(idx) != new_window.get(idx):
+            changed.add(idx[0])
+    for ex in data['EX']:
+        if old['DX'].get(ex) != data['DX'][ex] or ex not in solution['schedule']:
+            changed.add(ex)
+    activities = set()
+    for e in set(old['CX']) | set(new['CX']):
+        if sorted(old['CX'].get(e, [])) != sorted(new['CX'].get(e, [])):
+            activities.update([e] + old['CX'].get(e, []) + new['CX'].get(e, []))
+    for e in set(old['undan_eftir']) | set(new['undan_eftir']):
+        if old['undan_eftir'].get(e) != new['undan_eftir'].get(e):
+            activities.update(v for v in (e, old['undan_eftir'].get(e), new['undan_eftir'].get(e)) if v)
+    for e in activities:
+        changed.update(data['EXsubset'].get(e, []))
+    return changed & set(data['EX'])
+
+
+def neighbourhood(solution, data, index=None):
+    """
+    Exercises to re-optimise after an edit: the changed exercises and every exercise that was
+    scheduled on a (day, physical unit) the changed exercises can use or used before.
+    """
+    if index is None:
+        index = build_index(data)
+    units = index['area_units']
+    changed = changed_exercises(solution, data)
+    cells = set()
+    for (ex, d, a) in data['EDA']:
+        if ex in changed:
+            cells.update((d, u) for u in units.get(a, [a]))
+    for ex, (d, a, start) in solution['schedule'].items():
+        if ex in changed:
+            cells.update((d, u) for u in units.get(a, [a]))
+    free = set(changed)
+    for ex, (d, a, start) in solution['schedule'].items():
+        if any((d, u) in cells for u in units.get(a, [a])):
+            free.add(ex)
+    return free & set(data['EX'])
+
+
+def start_values(solution, data, index=None):
+    """
+    Start values (x, z, y) for the current inputs from a saved solution. y is taken from the
+    solution, or from the order of the two starts for pairs it does not have.
+    """
+    if index is None:
+        index = build_index(data)
+    schedule = {ex: (d, a, start) for ex, (d, a, start) in solution['schedule'].items()
+                if (ex, d, a) in index['EDA_set']}
+    x = {(ex, d, a): start for ex, (d, a, start) in schedule.items()}
+    y = {}
+    for (e1, e2) in index['ExE']:
+        if (e1, e2) in solution['y']:
+            y[e1, e2] = solution['y'][e1, e2]
+        elif e1 in schedule and e2 in schedule:
+            y[e1, e2] = 0 if schedule[e1][2] <= schedule[e2][2] else 1
+    return schedule, x, y
+
+
+def apply_start(model, vars, solution, data, index=None, keep='fix'):
+    """
+    Feed a saved solution to a Gurobi model from build_model as a MIP start. Exercises outside the
+    neighbourhood of the edit keep their day, area and start time: fixed if keep='fix', or as a
+    variable hint if keep='hint'. Returns the set of exercises left free.
+    """
+    if index is None:
+        index = build_index(data)
+    schedule, x_start, y_start = start_values(solution, data, index)
+    free = neighbourhood(solution, data, index)
+    x, z, y = vars['x'], vars['z'], vars['y']
+    # a partial start: Gurobi completes the values of the free exercises
+    for idx, var in z.items():
+        if idx[0] in free or idx[0] not in schedule:
+            continue
+        value = 1 if idx in x_start else 0
+        var.Start = value
+        x[idx].Start = x_start.get(idx, 0)
+        if keep == 'fix':
+            var.lb = var.ub = value
+            x[idx].lb = x[idx].ub = x_start.get(idx, 0)
+        else:
+            var.VarHintVal = value
+            x[idx].VarHintVal = x_start.get(idx, 0)
+    for p, value in y_start.items():
+        if p in y and p[0] not in free and p[1] not in free:
+            y[p].Start = value
+    return free
+
+
+def apply_hint(model, vars, solution, data, index=None, keep='fix'):
+    """
+    Same as apply_start for a CP-SAT model from run_ortools.build_model, using AddHint.
+    """
+    if index is None:
+        index = build_index(data)
+    schedule, x_start, y_start = start_values(solution, data, index)
+    free = neighbourhood(solution, data, index)
+    x, z = vars['x'], vars['z']
+    for idx, var in z.items():
+        value = 1 if idx in x_start else 0
+        model.AddHint(var, value)
+        model.AddHint(x[idx], round(x_start.get(idx, 0)))
+        if keep == 'fix' and idx[0] not in free and idx[0] in schedule:
+            model.Add(var == value)
+            model.Add(x[idx] == round(x_start.get(idx, 0)))
+    return free
+
+
+def schedule_start(model, vars, schedule, data, index=None):
+    """
+    Feed a schedule {ex: (d, a, start)}, e.g. from greedy_schedule, to a Gurobi model from build_model
+    as a MIP start. Exercises missing from the schedule are left for Gurobi to complete.
+    """
+    if index is None:
+        index = build_index(data)
+    schedule, x_start, y_start = start_values({'schedule': schedule, 'y': {}}, data, index)
+    x, z, y = vars['x'], vars['z'], vars['y']
+    for idx, var in z.items():
+        if idx[0] in schedule:
+            var.Start = 1 if idx in x_start else 0
+            x[idx].Start = x_start.get(idx, 0)
+    for p, value in y_start.items():
+        if p in y:
+            y[p].Start = value
+
+
+def schedule_hint(model, vars, schedule, data, index=None):
+    """
+    Same as schedule_start for a CP-SAT model from run_ortools.build_model, using AddHint.
+    """
+    if index is None:
+        index = build_index(data)
+    schedule, x_start, y_start = start_values({'schedule': schedule, 'y': {}}, data, index)
+    x, z = vars['x'], vars['z']
+    for idx, var in z.items():
+        if idx[0] in schedule:
+            model.AddHint(var, 1 if idx in x_start else 0)
+            model.AddHint(x[idx], round(x_start.get(idx, 0)))
@@ -0,0 +1,103 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+import json
+import shutil
+import tempfile
+from model.data import get_session, load_data, build_index, model_size, schedule_objective
+from model.greedy import greedy_schedule
+from model.telemetry import PhaseTimer
+from utils.synthetic import create_database
+
+
+def solver_size(backend, model):
+    if backend == 'gurobi':
+        model.update()
+        return {'rows': model.NumConstrs, 'columns': model.NumVars, 'nonzeros': model.NumNZs}
+    proto = model.Proto()
+    return {'rows': len(proto.constraints), 'columns': len(proto.variables)}
+
+
+def run_benchmark(n_activities, seed=0, solve_model=False, time_limit=60, backend='gurobi', workers=8, options=None):
+    """
+    Benchmark one synthetic instance: data loading, index building, constraint generation and (optionally) solving.
+    options are passed on to build_model, e.g. {'bigm': 'tight'}.
+    """
+    if backend == 'gurobi':
+        from model.run_gurobi import build_model, solve
+    else:
+        from model.run_ortools import build_model, solve
+
+    tmpdir = tempfile.mkdtemp()
+    options = options or {}
+    record = {'activities': n_activities, 'seed': seed, 'backend': backend, **options}
+    try:
+        db_url = 'sqlite:///' + os.path.join(tmpdir, 'bench.db')
+        create_database(db_url, n_activities, seed).dispose()
+        db = get_session(db_url)
+        with PhaseTimer(record, 'load'):
+            data = load_data(db)
+        db.close()
+        with PhaseTimer(record, 'index'):
+            index = build_index(data)
+        with PhaseTimer(record, 'greedy'):
+            greedy = greedy_schedule(data, index)
+        record['greedy_placed'] = len(greedy)
+        if len(greedy) == len(data['EX']):
+            record['greedy_objective'] = schedule_objective(data, greedy)
+        with PhaseTimer(record, 'build'):
+            model, vars = build_model(data, index, **options)
+            record.update(solver_size(backend, model))
+        record.update(vars.get('stats', {}))
+        record.update(model_size(data, index))
+        if solve_model:
+            with PhaseTimer(record, 'solve'):
+                schedule = solve(model, vars, time_limit, workers, log=False)
+            record['objective'] = schedule_objective(data, schedule) if schedule is not None else None
+    finally:
+        shutil.rmtree(tmpdir, ignore_errors=True)
+    return record
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Time model building on synthetic clubs of increasing size.")
+    parser.add_argument('sizes', type=int, nargs='*', default=[10, 50, 100, 500, 1000, 2000],
+                        help="number of activities for each instance")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--solve', action='store_true', help="also solve each instance")
+    parser.add_argument('--time-limit', type=float, default=60, help="solver time limit in seconds")
+    parser.add_argument('--backend', choices=['gurobi', 'ortools'], default='gurobi')
+    parser.add_argument('--workers', type=int, default=8, help="Gurobi threads or CP-SAT search workers")
+    parser.add_argument('--bigm', choices=['global', 'tight'], default=None, help="Gurobi big-M mode")
+    parser.add_argument('--aggregate', action='store_true', help="Gurobi per (exercise, day) start variables")
+    parser.add_argument('--symmetry', action='store_true', help="order interchangeable exercises by day")
+    parser.add_argument('--lazy', action='store_true', help="Gurobi lazy physical unit disjunctions")
+    parser.add_argument('--out', default=None, help="append one JSON line per instance to this file")
+    args = parser.parse_args()
+    options = {'bigm': args.bigm} if args.bigm else {}
+    if args.aggregate:
+        options['aggregate'] = True
+    if args.symmetry:
+        options['symmetry'] = True
+    if args.lazy:
+        options['lazy'] = True
+
+    columns = ['activities', 'EX', 'EDA', 'y_sparse', 'rows', 'nonzeros', 'load_s', 'index_s', 'greedy_s', 'build_s', 'solve_s', 'objective', 'build_peak_mb']
+    print(' '.join(f'{c:>12}' for c in columns))
+    for n in args.sizes:
+        # A fresh process per instance, so the process peak memory is per instance
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+            record = pool.submit(run_benchmark, n, args.seed, args.solve, args.time_limit,
+                                 args.backend, args.workers, options).result()
+        print(' '.join(f'{record.get(c, "-"):>12}' for c in columns))
+        if args.out:
+            with open(args.out, 'a') as f:
+                f.write(json.dumps(record) + '\n')
+
+
+if __name__ == '__main__':
+    main()
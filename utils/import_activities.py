@@ -1,106 +1,281 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import io
+import urllib.request
 import pandas as pd
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from datetime import datetime
-from database.models import Base, Club, Area, Activity, Session, Conflict, Prerequisite
-
-url = 'https://docs.google.com/spreadsheets/d/1CGmM0ZN0Mi5mU0RoL4JeiJQjyUBJhI8Gf3u-oPvGn6E/export?format=csv&id=1CGmM0ZN0Mi5mU0RoL4JeiJQjyUBJhI8Gf3u-oPvGn6E&gid=0'
-df = pd.read_csv(url)
-
-# --- Split 'Salur/svæði' into set of area names ---
-df['Salur/svæði'] = df['Salur/svæði'].str.split('|').apply(lambda x: set(item.strip() for item in x) if isinstance(x, list) else set())
-
-# --- Set up SQLAlchemy session ---
-engine = create_engine('sqlite:///sports_schedule.db')
-Base.metadata.create_all(engine)
-SessionLocal = sessionmaker(bind=engine)
-db = SessionLocal()
-
-# --- Add Club (single club for now) ---
-club = Club(club_id='1', name='MyClub')
-db.merge(club)
-db.commit()
-
-# --- Areas: collect all unique area names ---
-all_areas = set()
-for areas in df['Salur/svæði']:
-    all_areas.update(areas)
-for area_name in all_areas:
-    area = Area(area_id=area_name, name=area_name)
-    db.merge(area)
-db.commit()
-
-# --- Activities and Sessions ---
+from sqlalchemy import create_engine, func, inspect, text
+from sqlalchemy.dialects.sqlite import insert
+from database.models import Base, Club, Area, AreaPart, Activity, Session, Conflict, Prerequisite
+
+URL = 'https://docs.google.com/spreadsheets/d/1CGmM0ZN0Mi5mU0RoL4JeiJQjyUBJhI8Gf3u-oPvGn6E/export?format=csv&id=1CGmM0ZN0Mi5mU0RoL4JeiJQjyUBJhI8Gf3u-oPvGn6E&gid=0'
+DB_URL = 'sqlite:///sports_schedule.db'
+
 DAYS = ['sun', 'mán', 'þri', 'mið', 'fim', 'fös', 'lau']
+CLUB_COLUMN = 'Félag'  # optional, for exports with many clubs
+PRIORITY_COLUMN = 'Forgangur'  # optional, club priority for shared halls (lower first)
+DEFAULT_CLUB = ('1', 'MyClub')
+
+# Composition of the subdivided halls, written to area_parts for the halls that appear in an export
+AREA_PARTS = {
+    'A-sal': ['1/3 A-sal-1', '1/3 A-sal-2', '1/3 A-sal-3'],
+    '2/3 A-sal': ['1/3 A-sal-1', '1/3 A-sal-2'],
+}
+
+# Tables whose rows of an activity are replaced by each import of it
+CHILD_TABLES = [Session.__table__, Conflict.__table__, Prerequisite.__table__]
+# Activity ids per DELETE, below SQLite's limit on bound parameters
+DELETE_BATCH = 500
+
+# Natural keys used to make re-imports idempotent
+NATURAL_KEYS = {
+    Session.__table__: ['activity_id', 'day_of_week', 'area_id'],
+    Conflict.__table__: ['activity_id', 'conflict_activity_id'],
+    Prerequisite.__table__: ['activity_id', 'must_be_before_activity_id'],
+    AreaPart.__table__: ['area_id', 'part_area_id'],
+}
+
+
+# --- Reading ---
+
+def read_chunks(source, chunksize=50000):
+    """
+    Yield DataFrames of at most chunksize rows from a CSV or Parquet file, given as a local path or a URL.
+    """
+    is_url = source.startswith(('http://', 'https://'))
+    if source.split('?')[0].endswith('.parquet'):
+        import pyarrow.parquet as pq
+        if is_url:
+            with urllib.request.urlopen(source) as response:
+                source = io.BytesIO(response.read())
+        for batch in pq.ParquetFile(source).iter_batches(batch_size=chunksize):
+            yield batch.to_pandas()
+    else:
+        yield from pd.read_csv(source, chunksize=chunksize)
+
+
+# --- Vectorised parsing ---
+
+def clean(df):
+    """
+    Replace missing values with None, so rows can be passed to the database as they are.
+    """
+    return df.astype(object).where(df.notna(), None)
+
+
+def split_pipe(col):
+    """
+    Split a pipe list column ('a|b|c') into one stripped, non-empty item per row (same index as col).
+    """
+    items = col.dropna().astype(str).str.split('|').explode().str.strip()
+    return items[items != '']
+
+
+def to_int(col):
+    return pd.to_numeric(col, errors='coerce').astype('Int64')
+
+
+def to_date(col):
+    dates = pd.to_datetime(col, format='%d.%m.%Y', errors='coerce')
+    dates = dates.fillna(pd.to_datetime(col, format='%Y-%m-%d', errors='coerce'))
+    return dates.dt.date
+
+
+def to_minutes(col):
+    """
+    Parse 'HH:MM-HH:MM' windows into (min_start, max_end) minutes from midnight, missing if unparsable.
+    """
+    parts = col.astype(str).str.extract(r'^\s*(\d{1,2}):(\d{2})\s*-\s*(\d{1,2}):(\d{2})\s*$').astype(float)
+    return (parts[0]*60 + parts[1]).astype('Int64'), (parts[2]*60 + parts[3]).astype('Int64')
+
+
+def optional(df, column):
+    return df[column] if column in df.columns else pd.Series(None, index=df.index, dtype=object)
+
+
+def parse_clubs(df, club=DEFAULT_CLUB):
+    if CLUB_COLUMN in df.columns:
+        clubs = pd.DataFrame({'club_id': df[CLUB_COLUMN].astype('string').str.strip(),
+                              'priority': to_int(optional(df, PRIORITY_COLUMN))}).dropna(subset=['club_id'])
+        clubs = clubs.sort_values('priority').drop_duplicates('club_id')
+        clubs = pd.DataFrame({'club_id': clubs['club_id'], 'name': clubs['club_id'], 'priority': clubs['priority']})
+        if df[CLUB_COLUMN].astype('string').str.strip().isna().any() and club[0] not in set(clubs['club_id']):
+            # rows without a Félag cell belong to club, see parse_activities
+            clubs = pd.concat([clubs, pd.DataFrame([(club[0], club[1], None)], columns=clubs.columns)], ignore_index=True)
+        return clubs
+    return pd.DataFrame([club], columns=['club_id', 'name'])
+
+
+def parse_activities(df, club=DEFAULT_CLUB):
+    lengths = {}
+    for column in ['Lengd', 'LengdHelgar']:
+        lengths[column] = df[column].astype('string').str.replace(r'\s*,\s*', ',', regex=True).str.strip()
+    club_id = df[CLUB_COLUMN].astype('string').str.strip().fillna(club[0]) if CLUB_COLUMN in df.columns else club[0]
+    return pd.DataFrame({
+        'activity_id': df['Æfing'],
+        'club_id': club_id,
+        'groups_count': to_int(df['Æfingarhópar']),
+        'prerequisite_activity_id': df['fyrir/undan'],
+        'weekend_count': to_int(df['Fjöldi helgaræfinga']),
+        'week_count': to_int(df['Fjöldi vikuæfinga']),
+        'length_str': lengths['Lengd'],
+        'length_weekend_str': lengths['LengdHelgar'],
+        'conflict_str': df['Árekstur'].astype('string'),
+        'same_time_str': optional(df, 'Sama tíma').astype('string'),
+        'period_start': to_date(optional(df, 'Tímabil byrjar')),
+        'period_end': to_date(optional(df, 'tímabil endar')),
+        'participant_count': to_int(df['Fjöldi iðkennda']),
+    }).dropna(subset=['activity_id']).drop_duplicates('activity_id', keep='last')
+
+
+def parse_sessions(df):
+    """
+    One row per (activity, day, area) for every day with a time window and every area in 'Salur/svæði'.
+    """
+    days = [d for d in DAYS if d in df.columns]
+    windows = df[['Æfing'] + days].melt(id_vars='Æfing', var_name='day_of_week', value_name='time', ignore_index=False)
+    windows = windows[windows['time'].notna() & (windows['time'].astype(str).str.strip() != '')]
+    windows['min_start'], windows['max_end'] = to_minutes(windows['time'])
+    areas = split_pipe(df['Salur/svæði']).rename('area_id')
+    sessions = windows.join(areas, how='inner').rename(columns={'Æfing': 'activity_id'})
+    sessions = sessions[['activity_id', 'day_of_week', 'area_id', 'min_start', 'max_end']]
+    return sessions.drop_duplicates(NATURAL_KEYS[Session.__table__], keep='last')
+
+
+def parse_areas(df):
+    names = split_pipe(df['Salur/svæði']).unique()
+    parts = [p for a in names for p in AREA_PARTS.get(a, [])]
+    names = pd.unique(pd.Series(list(names) + parts, dtype=object))
+    return pd.DataFrame({'area_id': names, 'name': names})
+
+
+def parse_area_parts(df):
+    names = split_pipe(df['Salur/svæði']).unique()
+    return pd.DataFrame([(a, p) for a in names for p in AREA_PARTS.get(a, [])], columns=['area_id', 'part_area_id'])
+
+
+def parse_conflicts(df):
+    conflicts = pd.DataFrame({'activity_id': df['Æfing']}).join(split_pipe(df['Árekstur']).rename('conflict_activity_id'), how='inner')
+    return conflicts.drop_duplicates()
+
+
+def parse_prerequisites(df):
+    prereqs = pd.DataFrame({'activity_id': df['Æfing'], 'must_be_before_activity_id': df['fyrir/undan']})
+    return prereqs.dropna().drop_duplicates()
+
+
+# --- Writing ---
+
+def ensure_club_priority(conn):
+    """
+    Add clubs.priority to databases created before the column existed.
+    """
+    if 'priority' not in {c['name'] for c in inspect(conn).get_columns('clubs')}:
+        conn.execute(text("ALTER TABLE clubs ADD COLUMN priority INTEGER"))
+
+
+def ensure_natural_keys(conn):
+    """
+    Create the tables and the natural key indexes, also on databases created before the indexes existed
+    (dropping rows that were duplicated by earlier imports).
+    """
+    Base.metadata.create_all(conn)
+    ensure_club_priority(conn)
+    for table, keys in NATURAL_KEYS.items():
+        pk = list(table.primary_key.columns)[0].name
+        conn.execute(text(
+            f"DELETE FROM {table.name} WHERE {pk} NOT IN "
+            f"(SELECT MIN({pk}) FROM {table.name} GROUP BY {', '.join(keys)})"
+        ))
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+def upsert(conn, table, rows, keys, update=True, keep=(), skip=()):
+    """
+    Bulk insert rows (a DataFrame), updating (or skipping) rows whose natural key already exists.
+    Columns in keep are only updated where the new value is not null, columns in skip are never updated.
+    """
+    if rows.empty:
+        return 0
+    records = clean(rows).to_dict('records')
+    stmt = insert(table)
+    columns = [c for c in rows.columns if c not in keys and c not in skip]
+    if update and columns:
+        stmt = stmt.on_conflict_do_update(index_elements=keys, set_={
+            c: func.coalesce(stmt.excluded[c], table.c[c]) if c in keep else stmt.excluded[c] for c in columns
+        })
+    else:
+        stmt = stmt.on_conflict_do_nothing(index_elements=keys)
+    conn.execute(stmt, records)
+    return len(records)
+
+
+def delete_children(conn, activity_ids):
+    """
+    Delete the sessions, conflicts and prerequisites of the given activities, so a re-import replaces them
+    instead of keeping days, areas and links that were removed from the sheet.
+    """
+    activity_ids = list(activity_ids)
+    for i in range(0, len(activity_ids), DELETE_BATCH):
+        batch = activity_ids[i:i + DELETE_BATCH]
+        for table in CHILD_TABLES:
+            conn.execute(table.delete().where(table.c.activity_id.in_(batch)))
+
+
+def import_frame(conn, df, club=DEFAULT_CLUB):
+    """
+    Import one chunk of the activity sheet. Returns the number of rows written per table.
+    club (id, name) is the club of every activity in exports without a Félag column.
+    The sessions, conflicts and prerequisites of the chunk's activities replace the stored ones.
+    """
+    df = df.rename(columns=lambda c: str(c).strip())
+    activities = parse_activities(df, club)
+    delete_children(conn, clean(activities['activity_id']).tolist())
+    return {
+        'clubs': upsert(conn, Club.__table__, parse_clubs(df, club), ['club_id'], update=PRIORITY_COLUMN in df.columns,
+                        keep=['priority'], skip=['name']),
+        'areas': upsert(conn, Area.__table__, parse_areas(df), ['area_id'], update=False),
+        'area_parts': upsert(conn, AreaPart.__table__, parse_area_parts(df), NATURAL_KEYS[AreaPart.__table__],
+                             update=False),
+        'activities': upsert(conn, Activity.__table__, activities, ['activity_id']),
+        'sessions': upsert(conn, Session.__table__, parse_sessions(df), NATURAL_KEYS[Session.__table__]),
+        'conflicts': upsert(conn, Conflict.__table__, parse_conflicts(df), NATURAL_KEYS[Conflict.__table__], update=False),
+        'prerequisites': upsert(conn, Prerequisite.__table__, parse_prerequisites(df),
+                                NATURAL_KEYS[Prerequisite.__table__], update=False),
+    }
+
+
+def import_source(source, db_url=DB_URL, chunksize=50000, club=DEFAULT_CLUB):
+    """
+    Import a CSV or Parquet export (path or URL) into the database in one transaction.
+    """
+    engine = create_engine(db_url)
+    totals = {}
+    with engine.begin() as conn:
+        ensure_natural_keys(conn)
+        for chunk in read_chunks(source, chunksize):
+            for table, n in import_frame(conn, chunk, club).items():
+                totals[table] = totals.get(table, 0) + n
+    engine.dispose()
+    return totals
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Import activities from a CSV or Parquet export (path or URL).")
+    parser.add_argument('source', nargs='?', default=URL, help="CSV or Parquet file, local path or URL")
+    parser.add_argument('--db', default=DB_URL, help="SQLAlchemy database URL")
+    parser.add_argument('--chunksize', type=int, default=50000, help="rows read at a time")
+    parser.add_argument('--club', nargs=2, metavar=('ID', 'NAME'), default=DEFAULT_CLUB,
+                        help="club of the activities, for exports without a Félag column")
+    args = parser.parse_args()
+
+    totals = import_source(args.source, args.db, args.chunksize, tuple(args.club))
+    print(', '.join(f'{n} {table}' for table, n in totals.items()))
+    print("Import complete!")
 
-def parse_date(val):
-    if pd.isna(val):
-        return None
-    for fmt in ("%d.%m.%Y", "%Y-%m-%d"):
-        try:
-            return datetime.strptime(str(val), fmt).date()
-        except Exception:
-            continue
-    return None
-
-for idx, row in df.iterrows():
-    activity_id = row['Æfing']
-    activity = Activity(
-        activity_id = activity_id,
-        club_id = club.club_id,
-        groups_count = int(row['Æfingarhópar']) if not pd.isna(row['Æfingarhópar']) else None,
-        prerequisite_activity_id = row['fyrir/undan'] if not pd.isna(row['fyrir/undan']) else None,
-        weekend_count = int(row['Fjöldi helgaræfinga']) if not pd.isna(row['Fjöldi helgaræfinga']) else None,
-        week_count = int(row['Fjöldi vikuæfinga']) if not pd.isna(row['Fjöldi vikuæfinga']) else None,
-        length_str = ','.join(str(x).strip() for x in str(row['Lengd']).split(',')) if not pd.isna(row['Lengd']) else None,
-        length_weekend_str = ','.join(str(x).strip() for x in str(row['LengdHelgar']).split(',')) if not pd.isna(row['LengdHelgar']) else None,
-        conflict_str = str(row['Árekstur']) if not pd.isna(row['Árekstur']) else None,
-        same_time_str = str(row['Sama tíma']) if 'Sama tíma' in row and not pd.isna(row['Sama tíma']) else None,
-        period_start = parse_date(row['Tímabil byrjar']) if 'Tímabil byrjar' in row else None,
-        period_end = parse_date(row['tímabil endar']) if 'tímabil endar' in row else None,
-        participant_count = int(row['Fjöldi iðkennda']) if not pd.isna(row['Fjöldi iðkennda']) else None
-    )
-    db.merge(activity)
-
-    # Sessions: for each area and day where there is a time
-    for area_id in row['Salur/svæði']:
-        for d in DAYS:
-            time_range = row[d] if d in row and not pd.isna(row[d]) else None
-            if time_range:
-                try:
-                    start, end = [t.strip() for t in time_range.split('-')]
-                    h1, m1 = map(int, start.split(':'))
-                    h2, m2 = map(int, end.split(':'))
-                    min_start = h1*60 + m1
-                    max_end = h2*60 + m2
-                except Exception:
-                    min_start = None
-                    max_end = None
-                sess = Session(
-                    activity_id=activity_id,
-                    day_of_week=d,
-                    area_id=area_id,
-                    min_start=min_start,
-                    max_end=max_end
-                )
-                db.add(sess)
-db.commit()
-
-# --- Conflicts (Árekstur) ---
-for idx, row in df.iterrows():
-    if not pd.isna(row['Árekstur']):
-        activity_id = row['Æfing']
-        for c in row['Árekstur'].split('|'):
-            c = c.strip()
-            if c:
-                db.add(Conflict(activity_id=activity_id, conflict_activity_id=c))
-db.commit()
-
-# --- Prerequisites (fyrir/undan) ---
-for idx, row in df.iterrows():
-    if not pd.isna(row['fyrir/undan']):
-        db.add(Prerequisite(activity_id=row['Æfing'], must_be_before_activity_id=row['fyrir/undan']))
-db.commit()
-
-print("Import complete!")
 
+if __name__ == '__main__':
+    main()
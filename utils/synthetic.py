@@ -0,0 +1,95 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+import argparse
+import random
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database.models import Base, Club, Area, AreaPart, Activity, Session, Conflict, Prerequisite
+
+DAYS = ['sun', 'mán', 'þri', 'mið', 'fim', 'fös', 'lau']
+WEEKEND = ['sun', 'lau']
+HALL_AREAS = ['A-sal', '2/3 A-sal', '1/3 A-sal-1', '1/3 A-sal-2', '1/3 A-sal-3']
+HALL_PARTS = {
+    'A-sal': ['1/3 A-sal-1', '1/3 A-sal-2', '1/3 A-sal-3'],
+    '2/3 A-sal': ['1/3 A-sal-1', '1/3 A-sal-2'],
+}
+
+
+def generate_club(db, n_activities, club_id='1', seed=0, activities_per_area=4, hall_rate=0.1, conflict_rate=0.05, prerequisite_rate=0.03):
+    """
+    Write a synthetic club with n_activities activities (and their sessions, conflicts and prerequisites) to db.
+    Areas are added at a rate of one per activities_per_area activities; a hall_rate share of the
+    activities may also use the A-sal hall.
+    """
+    rng = random.Random(seed)
+    n_areas = max(1, n_activities // activities_per_area)
+    areas = [f'{club_id}-svæði-{i+1}' for i in range(n_areas)]
+
+    db.merge(Club(club_id=club_id, name=f'Synthetic club {club_id}'))
+    for area_id in HALL_AREAS + areas:
+        db.merge(Area(area_id=area_id, name=area_id))
+    if db.query(AreaPart).filter(AreaPart.area_id.in_(list(HALL_PARTS))).count() == 0:
+        db.add_all(AreaPart(area_id=a, part_area_id=p) for a, parts in HALL_PARTS.items() for p in parts)
+
+    activity_ids = [f'{club_id}-æfing-{i+1}' for i in range(n_activities)]
+    rows = []
+    for activity_id in activity_ids:
+        week_count = rng.randint(1, 4)
+        weekend_count = rng.choice([0, 0, 1])
+        rows.append(Activity(
+            activity_id=activity_id,
+            club_id=club_id,
+            groups_count=1,
+            weekend_count=weekend_count,
+            week_count=week_count,
+            length_str=','.join(str(rng.choice([45, 60, 75, 90])) for _ in range(week_count)),
+            length_weekend_str=','.join(str(rng.choice([60, 90])) for _ in range(weekend_count)) or None,
+            participant_count=rng.randint(8, 30),
+        ))
+        # Sessions: a few areas, all weekdays (and the weekend if needed), with a random window
+        allowed_areas = rng.sample(areas, min(len(areas), rng.randint(1, 2)))
+        if rng.random() < hall_rate:
+            allowed_areas.append(rng.choice(HALL_AREAS))
+        days = [d for d in DAYS if d not in WEEKEND] + (WEEKEND if weekend_count else [])
+        min_start = rng.choice([14, 15, 16, 17])*60
+        max_end = min_start + rng.choice([3, 4, 5, 6])*60
+        for area_id in allowed_areas:
+            for d in days:
+                rows.append(Session(activity_id=activity_id, day_of_week=d, area_id=area_id,
+                                    min_start=min_start, max_end=max_end))
+
+    for i, activity_id in enumerate(activity_ids):
+        if len(activity_ids) > 1 and rng.random() < conflict_rate:
+            other = rng.choice([a for a in activity_ids if a != activity_id])
+            rows.append(Conflict(activity_id=activity_id, conflict_activity_id=other))
+        if i + 1 < len(activity_ids) and rng.random() < prerequisite_rate:
+            rows.append(Prerequisite(activity_id=activity_id, must_be_before_activity_id=activity_ids[i+1]))
+    db.add_all(rows)
+    db.commit()
+    return activity_ids
+
+
+def create_database(db_url, n_activities, seed=0):
+    engine = create_engine(db_url)
+    Base.metadata.create_all(engine)
+    SessionLocal = sessionmaker(bind=engine)
+    db = SessionLocal()
+    generate_club(db, n_activities, seed=seed)
+    db.close()
+    return engine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Write a synthetic club to a database.")
+    parser.add_argument('n_activities', type=int, help="number of activities (10 to 2000)")
+    parser.add_argument('--db', default='sqlite:///synthetic_schedule.db', help="SQLAlchemy database URL")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    create_database(args.db, args.n_activities, args.seed)
+    print(f"Wrote {args.n_activities} synthetic activities to {args.db}")
+
+
+if __name__ == '__main__':
+    main()